@@ -6,142 +6,3376 @@ Analyzes a large CSV file containing Taegis XDR detections and generates
 a Sankey diagram showing the flow: sensor_types → severity → status.
 """
 
+import numpy as np
 import pandas as pd
 import json
 import ast
+import bz2
+import contextlib
+import cProfile
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
 import sys
-from collections import defaultdict
+import threading
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from collections import Counter, deque
 from pathlib import Path
 import plotly.graph_objects as go
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then left out of --metrics-json
+    resource = None
+
+
+# Columns the sensor_type → severity → status flows are built from
+FLOW_DIMENSIONS = ('sensor_types', 'severity', 'status')
+
+# Tokens of a --where expression: parentheses and commas, comparison
+# operators, single- or double-quoted values, and bare words (keywords,
+# column names and unquoted values)
+WHERE_TOKEN_PATTERN = re.compile(
+    r"""\s*(?:([(),])|(!=|<>|==|>=|<=|=|<|>)|'([^']*)'|"([^"]*)"|([^\s(),=!<>'"]+))"""
+)
+
+# Keywords of a --where expression (matched case-insensitively)
+WHERE_KEYWORDS = ('and', 'or', 'not', 'in')
+
+# Ordered --where comparisons, which compare values as timestamps
+WHERE_TIME_OPERATORS = ('<', '<=', '>', '>=')
+
+# Default timestamp column of --since/--until
+TIME_COLUMN = 'created_at'
+
+# Units of relative --since/--until durations such as 7d or 12h, in seconds
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# Strings read as missing values; mirrors pandas' read_csv defaults so that
+# every engine treats the same cells as empty
+CSV_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null',
+]
+
+# Bytes of CSV text per record batch for the pyarrow engine
+ARROW_BLOCK_SIZE = 16 * 1024 * 1024
+
+# --max-memory: rows in the first chunk, read to measure the bytes per row
+ADAPTIVE_PROBE_ROWS = 1000
+
+# --max-memory: largest factor a chunk may grow by over the previous one
+ADAPTIVE_MAX_GROWTH = 4
+
+# --max-memory: working-set bytes per byte of CSV text parsed, i.e. the text
+# buffer plus the tokenizer's per-field offsets (all columns are tokenized,
+# even those not materialized)
+PARSER_MEMORY_FACTOR = 3
+
+# --max-memory: fraction of the budget given to one pyarrow block; Arrow
+# keeps a block being read ahead and its parsed arrays besides the text
+ARROW_BLOCK_MEMORY_SHARE = 1 / 8
+
+# Suffixes accepted by --max-memory
+MEMORY_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# Maximum number of distinct raw sensor_types strings kept in the parse cache
+SENSOR_TYPES_CACHE_SIZE = 65536
+
+# Leading words that make a bare sensor_types value a JSON or Python literal
+# (e.g. true, None, NaN), which tokenize_sensor_types leaves to parse_sensor_types
+LITERAL_WORDS = frozenset(['true', 'false', 'null', 'NaN', 'Infinity', 'True', 'False', 'None'])
+
+# Whitespace skipped between the items of a sensor_types array
+ARRAY_WHITESPACE = ' \t'
+
+# A non-empty sensor name that JSON and Python decode identically (no
+# escapes, quotes or control characters)
+SENSOR_NAME_CHARS = r'[\w .:/@#&+()\-]+'
+
+# sensor_types values exploded with vectorized string operations: an array of
+# quoted names (with an optional trailing comma, which only ast.literal_eval
+# accepts), possibly wrapped in one more pair of double quotes. Written without
+# backreferences so that both Python and Arrow (RE2) regexes accept it
+_SENSOR_ITEMS = (rf'''[ \t]*(?:(?:"{SENSOR_NAME_CHARS}"|'{SENSOR_NAME_CHARS}')[ \t]*,[ \t]*)*'''
+                 rf'''(?:(?:"{SENSOR_NAME_CHARS}"|'{SENSOR_NAME_CHARS}')[ \t]*)?''')
+SENSOR_ARRAY_PATTERN = rf'\s*(?:\[{_SENSOR_ITEMS}\]|"\[{_SENSOR_ITEMS}\]")\s*'
+
+# Everything around the items of a SENSOR_ARRAY_PATTERN value
+SENSOR_ARRAY_WRAPPER_PATTERN = r'^\s*"?\[|\]"?\s*$'
+
+# One name of a SENSOR_ARRAY_PATTERN value, capturing it without its quotes
+SENSOR_QUOTED_NAME_PATTERN = rf'''["']({SENSOR_NAME_CHARS})["']'''
+
+# Byte ranges handed to --workers are never split smaller than this
+MIN_RANGE_SIZE = 8 * 1024 * 1024
+
+# Read size used when scanning raw bytes for record boundaries
+SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+QUOTE_BYTE = ord('"')
+
+# Complete records a --since/--until sample must parse before it is trusted
+TIME_SAMPLE_RECORDS = 3
+
+# Window read around a sampled offset, doubled while no record start is found
+TIME_SAMPLE_WINDOW = 64 * 1024
+TIME_SAMPLE_MAX_WINDOW = 8 * 1024 * 1024
+
+# Evenly spaced samples telling whether a file is sorted by time
+TIME_SORT_SAMPLES = 17
+
+# The --since/--until binary search stops once its interval is this small
+TIME_SEARCH_RESOLUTION = 64 * 1024
+
+# Slack added on both sides of a time window for records slightly out of order
+TIME_RANGE_MARGIN = 1024 * 1024
+
+# Sample blocks hashed into a file's fingerprint, see get_file_fingerprint
+FINGERPRINT_SAMPLES = 16
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+# Leading bytes identifying compressed exports
+COMPRESSION_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'BZh', 'bz2'),
+    (b'PK\x03\x04', 'zip'),
+]
+
+# csv_file argument that reads the export from standard input
+STDIN_PATH = '-'
+
+# Compressed bytes per task when independent frames are decompressed in parallel
+DECOMPRESS_GROUP_SIZE = 8 * 1024 * 1024
+
+# Bumped whenever the layout of the result cache or checkpoint files changes
+RESULT_CACHE_VERSION = 1
+CHECKPOINT_VERSION = 1
+
+# Partial aggregate files written by --emit-partial and combined by the merge
+# subcommand: magic, then a little-endian uint16 format version
+PARTIAL_MAGIC = b'TDXAGG\0\0'
+PARTIAL_VERSION = 1
+
+# Pipeline stages timed and profiled separately by --profile
+PROFILE_STAGES = ('read', 'parse', 'filter', 'aggregate', 'summary', 'render')
+
+# Seconds between stack samples taken for the --profile flame graph
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# Active StageProfiler while --profile is in effect
+_profiler = None
+
+# Layout version of the --metrics-json file
+METRICS_VERSION = 2
+
+# Active RunMetrics while --metrics-json is in effect
+_metrics = None
+
+# Reports of the scan tasks run in worker processes, see run_worker_task
+_worker_reports = []
+
+
+class StageProfiler:
+    """
+    Profile the pipeline stage by stage for --profile.
+    
+    Every stage gets its own cProfile.Profile, enabled only while that stage
+    runs, plus its wall time. A background thread samples the main thread's
+    stack so the run can be drawn as a flame graph, each stack rooted at the
+    stage it was taken in ('other' outside any stage). Stages do not nest: a
+    stage entered inside another is counted as part of the outer one.
+    """
+    
+    def __init__(self, sample_interval=PROFILE_SAMPLE_INTERVAL):
+        self.profiles = {}
+        self.wall_times = {}
+        self.current = None
+        self.samples = Counter()
+        self.sample_interval = sample_interval
+        self.start_time = time.perf_counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Attribute the enclosed code to a pipeline stage."""
+        if self.current is not None:
+            yield
+            return
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        self.current = name
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.wall_times[name] = self.wall_times.get(name, 0.0) + time.perf_counter() - start
+            self.current = None
+    
+    def _sample(self):
+        """Record the main thread's stack every sample_interval seconds."""
+        while not self._stopped.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(self.current or 'other')
+            self.samples[';'.join(reversed(stack))] += 1
+    
+    def finish(self, profile_dir):
+        """
+        Stop sampling and write <stage>.pstats files and stacks.collapsed
+        (one 'frame;frame;... count' line per distinct stack) to profile_dir.
+        
+        Returns:
+            Total wall time in seconds since profiling started
+        """
+        self._stopped.set()
+        self._sampler.join()
+        total = time.perf_counter() - self.start_time
+        profile_dir = Path(profile_dir)
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        for name, profile in self.profiles.items():
+            profile.dump_stats(str(profile_dir / f"{name}.pstats"))
+        with open(profile_dir / 'stacks.collapsed', 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        return total
+
+
+def get_peak_rss_mb(include_children=True):
+    """
+    Return the peak RSS in MB of this process, or None. With include_children
+    it is the larger of that and the peak of the largest finished child process.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def get_tracemalloc_peak_mb():
+    """Return the tracemalloc peak in MB if tracing is on (python -X tracemalloc), else None."""
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+
+class RunMetrics:
+    """
+    Collect machine-readable run metrics for --metrics-json: per-stage wall
+    times, per-chunk rows, bytes and throughput, and memory high-water marks.
+    
+    Peak RSS comes from getrusage. tracemalloc peaks are recorded per stage
+    when Python runs with tracemalloc enabled (-X tracemalloc or
+    PYTHONTRACEMALLOC=1), as tracing slows the scan down considerably.
+    
+    Scan tasks run in worker processes record their own stages and chunks,
+    which are merged in with merge_worker: stage times are summed over the
+    processes, and the total peak RSS adds up the peak of every worker.
+    """
+    
+    def __init__(self, options=None):
+        self.options = dict(options or {})
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        self.start_time = time.perf_counter()
+        self.stages = {}
+        self.chunks = []
+        self.totals = {}
+        self.current = None
+        self.worker_peak_rss_mb = {}
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the enclosed code as part of a pipeline stage."""
+        if self.current is not None:
+            yield
+            return
+        self.current = name
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.current = None
+            stage = self.stages.setdefault(name, {
+                'seconds': 0.0, 'calls': 0, 'peak_rss_mb': None, 'tracemalloc_peak_mb': None,
+            })
+            stage['seconds'] += elapsed
+            stage['calls'] += 1
+            for key, value in (('peak_rss_mb', get_peak_rss_mb()),
+                               ('tracemalloc_peak_mb', get_tracemalloc_peak_mb())):
+                if value is not None:
+                    stage[key] = max(stage[key] or 0.0, value)
+    
+    def record_chunk(self, rows, nbytes, seconds):
+        """Record one chunk read and aggregated in this process."""
+        self.chunks.append({
+            'chunk': len(self.chunks) + 1,
+            'rows': rows,
+            'bytes': nbytes,
+            'seconds': seconds,
+            'rows_per_sec': rows / seconds if seconds > 0 else None,
+            'peak_rss_mb': get_peak_rss_mb(),
+        })
+    
+    def merge_worker(self, pid, metrics):
+        """Merge the stages and chunks a worker process recorded for one scan task."""
+        for name, worker_stage in metrics['stages'].items():
+            stage = self.stages.setdefault(name, {
+                'seconds': 0.0, 'calls': 0, 'peak_rss_mb': None, 'tracemalloc_peak_mb': None,
+            })
+            stage['seconds'] += worker_stage['seconds']
+            stage['calls'] += worker_stage['calls']
+            for key in ('peak_rss_mb', 'tracemalloc_peak_mb'):
+                if worker_stage[key] is not None:
+                    stage[key] = max(stage[key] or 0.0, worker_stage[key])
+        for chunk in metrics['chunks']:
+            self.chunks.append(dict(chunk, chunk=len(self.chunks) + 1, worker_pid=pid))
+        if metrics['peak_rss_mb'] is not None:
+            self.worker_peak_rss_mb[pid] = max(self.worker_peak_rss_mb.get(pid, 0.0),
+                                               metrics['peak_rss_mb'])
+    
+    def record_totals(self, total_rows, excluded_rows, input_bytes):
+        """Record the row totals of the scan and the size of its input files."""
+        self.totals.update({
+            'rows': total_rows,
+            'excluded_rows': excluded_rows,
+            'input_bytes': input_bytes,
+        })
+    
+    def to_dict(self):
+        """Return the metrics as a JSON-serializable dict."""
+        wall_seconds = time.perf_counter() - self.start_time
+        rows = self.totals.get('rows')
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage)
+            # Scan stages process every row; summary and render work on the aggregates
+            if rows is not None and name in ('read', 'parse', 'filter', 'aggregate'):
+                stage['rows_per_sec'] = rows / stage['seconds'] if stage['seconds'] > 0 else None
+            stages[name] = stage
+        # Stages reset the tracemalloc peak, so the run's peak is the highest seen by any of them
+        tracemalloc_peaks = [stage['tracemalloc_peak_mb'] for stage in stages.values()]
+        tracemalloc_peaks.append(get_tracemalloc_peak_mb())
+        tracemalloc_peaks = [peak for peak in tracemalloc_peaks if peak is not None]
+        # Workers run concurrently, so their peaks are added to the main process's own
+        peak_rss_mb = get_peak_rss_mb(include_children=not self.worker_peak_rss_mb)
+        if peak_rss_mb is not None:
+            peak_rss_mb += sum(self.worker_peak_rss_mb.values())
+        totals = dict(self.totals)
+        totals.update({
+            'wall_seconds': wall_seconds,
+            'rows_per_sec': rows / wall_seconds if rows is not None and wall_seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb,
+            'processes': 1 + len(self.worker_peak_rss_mb),
+            'tracemalloc_peak_mb': max(tracemalloc_peaks) if tracemalloc_peaks else None,
+        })
+        return {
+            'version': METRICS_VERSION,
+            'started_at': self.started_at,
+            'argv': sys.argv[1:],
+            'options': self.options,
+            'totals': totals,
+            'stages': stages,
+            'chunks': self.chunks,
+        }
+
+
+def start_metrics(options=None):
+    """Start collecting --metrics-json run metrics."""
+    global _metrics
+    _metrics = RunMetrics(options)
+
+
+def stop_metrics(metrics_path):
+    """Atomically write the metrics collected since start_metrics to a JSON file."""
+    global _metrics
+    if _metrics is None:
+        return
+    metrics = _metrics
+    _metrics = None
+    write_json_state(metrics_path, metrics.to_dict())
+    print(f"Saved run metrics to {metrics_path}")
+
+
+def record_chunk_metrics(chunk, seconds):
+    """Record a chunk's rows, in-memory bytes and time for --metrics-json (no-op otherwise)."""
+    if _metrics is None:
+        return
+    if isinstance(chunk, pd.DataFrame):
+        nbytes = int(chunk.memory_usage(index=False, deep=True).sum())
+    else:
+        nbytes = chunk.nbytes
+    _metrics.record_chunk(len(chunk), nbytes, seconds)
+
+
+def profile_stage(name):
+    """
+    Context manager attributing the enclosed code to a pipeline stage for
+    --profile and --metrics-json (no-op when neither is enabled).
+    """
+    if _profiler is None and _metrics is None:
+        return contextlib.nullcontext()
+    return _enter_stage(name)
+
+
+@contextlib.contextmanager
+def _enter_stage(name):
+    with contextlib.ExitStack() as stack:
+        for collector in (_profiler, _metrics):
+            if collector is not None:
+                stack.enter_context(collector.stage(name))
+        yield
+
+
+def profile_iter(iterable, name):
+    """Yield from iterable, attributing the time spent producing each item to a stage."""
+    iterator = iter(iterable)
+    while True:
+        with profile_stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def start_profiling():
+    """Start profiling the pipeline stages for --profile."""
+    global _profiler
+    _profiler = StageProfiler()
+
+
+def stop_profiling(profile_dir):
+    """Write the profiles collected since start_profiling and print the per-stage times."""
+    global _profiler
+    if _profiler is None:
+        return
+    profiler = _profiler
+    _profiler = None
+    total = profiler.finish(profile_dir)
+    print("\nProfile (wall time per stage):")
+    for name in PROFILE_STAGES:
+        seconds = profiler.wall_times.get(name, 0.0)
+        share = 100 * seconds / total if total else 0.0
+        print(f"  {name:<10} {seconds:>9.2f}s {share:>5.1f}%")
+    other = max(total - sum(profiler.wall_times.values()), 0.0)
+    print(f"  {'other':<10} {other:>9.2f}s {100 * other / total if total else 0.0:>5.1f}%")
+    print(f"Saved profiles to {profile_dir}/ (<stage>.pstats for python -m pstats, "
+          f"stacks.collapsed for flamegraph.pl or speedscope)")
+
 
 def parse_sensor_types(sensor_types_str):
     """
-    Parse sensor_types field which is a JSON array string.
-    Handles various formats including quoted strings.
+    Parse sensor_types field which is a JSON array string.
+    Handles various formats including quoted strings.
+    """
+    if pd.isna(sensor_types_str) or sensor_types_str == '':
+        return []
+    
+    # Remove surrounding quotes if present
+    sensor_types_str = str(sensor_types_str).strip()
+    if sensor_types_str.startswith('"') and sensor_types_str.endswith('"'):
+        sensor_types_str = sensor_types_str[1:-1]
+    
+    try:
+        # Try JSON parsing first
+        parsed = json.loads(sensor_types_str)
+        if isinstance(parsed, list):
+            return [str(s).strip('"') for s in parsed]
+        return [str(parsed).strip('"')]
+    except (json.JSONDecodeError, ValueError):
+        try:
+            # Try ast.literal_eval as fallback
+            parsed = ast.literal_eval(sensor_types_str)
+            if isinstance(parsed, list):
+                return [str(s).strip('"') for s in parsed]
+            return [str(parsed).strip('"')]
+        except (ValueError, SyntaxError):
+            # If all else fails, try to extract from string directly
+            if sensor_types_str.startswith('[') and sensor_types_str.endswith(']'):
+                # Remove brackets and split
+                content = sensor_types_str[1:-1]
+                items = [s.strip().strip('"').strip("'") for s in content.split(',')]
+                return [s for s in items if s]
+            return [sensor_types_str]
+
+
+def tokenize_sensor_types(sensor_types_str):
+    """
+    Exception-free single-pass parser for the common sensor_types formats.
+    
+    Handles JSON arrays of strings, single-quoted Python lists, arrays wrapped
+    in an extra pair of double quotes, and bare names, returning exactly what
+    parse_sensor_types returns for them without going through json.loads,
+    ast.literal_eval and their exceptions. Returns None for anything else
+    (escapes, numbers, literals, nested values, unusual whitespace, ...), which
+    parse_sensor_types must then decide.
+    """
+    if not isinstance(sensor_types_str, str):
+        return None
+    if sensor_types_str == '':
+        return []
+    value = sensor_types_str.strip()
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1]
+    if not value:
+        return None
+    if value[0] == '[':
+        return _tokenize_sensor_types_array(value)
+    
+    # A bare name that is neither JSON nor a Python literal is returned whole
+    if not (value.isascii() and value.isprintable() and (value[0].isalpha() or value[0] == '_')):
+        return None
+    if '"' in value or "'" in value:
+        return None
+    word_end = 1
+    while word_end < len(value) and (value[word_end].isalnum() or value[word_end] == '_'):
+        word_end += 1
+    if value[:word_end] in LITERAL_WORDS:
+        return None
+    return [value]
+
+
+def _tokenize_sensor_types_array(value):
+    """Parse a bracketed array of quoted strings for tokenize_sensor_types, or return None."""
+    end = len(value) - 1
+    position = 1
+    items = []
+    while True:
+        while position < end and value[position] in ARRAY_WHITESPACE:
+            position += 1
+        if position >= end:
+            break
+        quote = value[position]
+        if quote != '"' and quote != "'":
+            return None
+        closing = value.find(quote, position + 1)
+        if closing < 0:
+            return None
+        item = value[position + 1:closing]
+        # Escapes and control characters are decoded differently by JSON and Python
+        if '\\' in item or not item.replace('\t', ' ').isprintable():
+            return None
+        items.append(item.strip('"'))
+        position = closing + 1
+        while position < end and value[position] in ARRAY_WHITESPACE:
+            position += 1
+        if position < end:
+            if value[position] != ',':
+                return None
+            position += 1
+    if value[end] != ']':
+        return None
+    return items
+
+
+@lru_cache(maxsize=SENSOR_TYPES_CACHE_SIZE)
+def _parse_sensor_types_memo(sensor_types_str):
+    parsed = tokenize_sensor_types(sensor_types_str)
+    if parsed is None:
+        parsed = parse_sensor_types(sensor_types_str)
+    return tuple(parsed)
+
+
+def parse_sensor_types_cached(sensor_types_str):
+    """
+    Memoized parse_sensor_types keyed on the raw string.
+    
+    Exports only carry a few dozen distinct sensor_types values, so each one is
+    parsed once and later rows are a cache lookup. Returns an immutable tuple.
+    """
+    if not isinstance(sensor_types_str, str):
+        return tuple(parse_sensor_types(sensor_types_str))
+    return _parse_sensor_types_memo(sensor_types_str)
+
+
+def explode_sensor_types(sensor_values):
+    """
+    Explode a column of sensor_types values into one entry per sensor type.
+    
+    Values that are arrays of plainly quoted names are unwrapped, split on
+    commas and exploded for the whole column at once, with Arrow compute
+    kernels when pyarrow is installed and pandas string methods otherwise.
+    Any other value goes through parse_sensor_types_cached, so the result is
+    the same as parsing every value with parse_sensor_types.
+    
+    Args:
+        sensor_values: Sequence of raw sensor_types values
+    
+    Returns:
+        Tuple of (value_index, sensor_types): for every exploded entry, the
+        position of its value in sensor_values and the sensor type, ordered
+        by position
+    """
+    sensor_values = list(sensor_values)
+    if pa is not None and all(isinstance(v, str) for v in sensor_values):
+        is_array, value_index, sensor_types = _explode_sensor_types_arrow(sensor_values)
+    else:
+        is_array, value_index, sensor_types = _explode_sensor_types_pandas(sensor_values)
+    
+    # Everything else is parsed value by value
+    other_index = []
+    other_sensor_types = []
+    for position in np.flatnonzero(~is_array).tolist():
+        parsed = parse_sensor_types_cached(sensor_values[position])
+        other_index.extend([position] * len(parsed))
+        other_sensor_types.extend(parsed)
+    
+    value_index = np.concatenate([value_index, np.array(other_index, dtype=np.int64)])
+    sensor_types = np.concatenate([sensor_types, np.array(other_sensor_types, dtype=object)])
+    order = np.argsort(value_index, kind='stable')
+    return value_index[order], sensor_types[order]
+
+
+def _explode_sensor_types_arrow(sensor_values):
+    """Vectorized part of explode_sensor_types using Arrow compute kernels."""
+    values = pa.array(sensor_values, type=pa.string())
+    is_array = pc.match_substring_regex(values, f"^(?:{SENSOR_ARRAY_PATTERN})$")
+    positions = np.flatnonzero(is_array.to_numpy(zero_copy_only=False))
+    items = pc.split_pattern(
+        pc.replace_substring_regex(values.take(pa.array(positions)), SENSOR_ARRAY_WRAPPER_PATTERN, ''),
+        ','
+    )
+    value_index = positions[pc.list_parent_indices(items).to_numpy()]
+    # Each item is whitespace around a quoted name; a trailing comma leaves an empty item
+    names = pc.utf8_slice_codeunits(pc.utf8_trim(pc.list_flatten(items), ' \t'), 1, -1)
+    keep = pc.greater(pc.utf8_length(names), 0).to_numpy(zero_copy_only=False)
+    sensor_types = np.array(names.to_pylist(), dtype=object)
+    return is_array.to_numpy(zero_copy_only=False), value_index[keep], sensor_types[keep]
+
+
+def _explode_sensor_types_pandas(sensor_values):
+    """Vectorized part of explode_sensor_types using pandas string methods."""
+    values = pd.Series(sensor_values, dtype=object)
+    is_array = values.str.fullmatch(SENSOR_ARRAY_PATTERN).fillna(False).astype(bool).to_numpy()
+    # Empty arrays explode to a missing value
+    names = values[is_array].str.findall(SENSOR_QUOTED_NAME_PATTERN).explode().dropna()
+    return is_array, names.index.to_numpy(dtype=np.int64), names.to_numpy(dtype=object)
+
+
+def clean_string_field(value):
+    """Remove surrounding quotes from string fields."""
+    if pd.isna(value):
+        return None
+    value = str(value).strip()
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1]
+    return value if value else None
+
+
+def get_required_columns(dimensions=FLOW_DIMENSIONS, where=None):
+    """
+    Return the de-duplicated list of CSV columns the requested dimensions and
+    the columns referenced by a --where expression need.
+    """
+    where_columns = get_where_columns(compile_where(where)) if where else []
+    return list(dict.fromkeys(list(dimensions) + where_columns))
+
+
+def tokenize_where(text):
+    """
+    Split a --where expression into (kind, text) tokens, where kind is 'op'
+    for punctuation and operators, 'word' for bare words and 'value' for
+    quoted values.
+    
+    Raises:
+        ValueError: If the expression contains a character no token starts with
+    """
+    tokens = []
+    text = text.rstrip()
+    position = 0
+    while position < len(text):
+        match = WHERE_TOKEN_PATTERN.match(text, position)
+        if match is None:
+            offset = len(text) - len(text[position:].lstrip())
+            raise ValueError(f"unexpected {text[offset]!r} at position {offset + 1}")
+        punctuation, operator, single_quoted, double_quoted, word = match.groups()
+        if punctuation or operator:
+            tokens.append(('op', punctuation or operator))
+        elif word is not None:
+            tokens.append(('word', word))
+        else:
+            tokens.append(('value', single_quoted if single_quoted is not None else double_quoted))
+        position = match.end()
+    return tokens
+
+
+@lru_cache(maxsize=None)
+def compile_where(text):
+    """
+    Compile a --where expression into a filter tree, once per expression.
+    
+    Grammar (keywords are case-insensitive):
+        expression := term ('or' term)*
+        term       := factor ('and' factor)*
+        factor     := 'not' factor | '(' expression ')' | comparison
+        comparison := column ('=' | '==' | '!=' | '<>') value
+                    | column ('<' | '<=' | '>' | '>=') timestamp
+                    | column ['not'] 'in' '(' value (',' value)* ')'
+    
+    Values are bare words or quoted strings. The tree is made of
+    ('or', children), ('and', children), ('not', child), ('in', column,
+    values) nodes with values casefolded, and ('time', column, operator,
+    microseconds) nodes for ordered comparisons of UTC timestamps.
+    
+    Raises:
+        ValueError: If the expression does not follow the grammar
+    """
+    tokens = tokenize_where(text)
+    if not tokens:
+        raise ValueError("empty expression")
+    node, position = _parse_where_or(tokens, 0)
+    if position < len(tokens):
+        raise ValueError(f"unexpected {tokens[position][1]!r}")
+    return node
+
+
+def _is_where_keyword(tokens, position, keyword):
+    """Return True if the token at position is the given keyword."""
+    return (position < len(tokens) and tokens[position][0] == 'word'
+            and tokens[position][1].lower() == keyword)
+
+
+def _parse_where_or(tokens, position):
+    """Parse 'term (or term)*' for compile_where, returning (node, next position)."""
+    children = []
+    while True:
+        node, position = _parse_where_and(tokens, position)
+        children.append(node)
+        if not _is_where_keyword(tokens, position, 'or'):
+            break
+        position += 1
+    return (children[0] if len(children) == 1 else ('or', tuple(children))), position
+
+
+def _parse_where_and(tokens, position):
+    """Parse 'factor (and factor)*' for compile_where, returning (node, next position)."""
+    children = []
+    while True:
+        node, position = _parse_where_factor(tokens, position)
+        children.append(node)
+        if not _is_where_keyword(tokens, position, 'and'):
+            break
+        position += 1
+    return (children[0] if len(children) == 1 else ('and', tuple(children))), position
+
+
+def _parse_where_factor(tokens, position):
+    """Parse a negation, a parenthesized expression or a comparison for compile_where."""
+    if position >= len(tokens):
+        raise ValueError("expression ends early")
+    if _is_where_keyword(tokens, position, 'not'):
+        node, position = _parse_where_factor(tokens, position + 1)
+        return ('not', node), position
+    if tokens[position] == ('op', '('):
+        node, position = _parse_where_or(tokens, position + 1)
+        if position >= len(tokens) or tokens[position] != ('op', ')'):
+            raise ValueError("missing ')'")
+        return node, position + 1
+    
+    kind, column = tokens[position]
+    if kind != 'word' or column.lower() in WHERE_KEYWORDS:
+        raise ValueError(f"expected a column name, got {column!r}")
+    position += 1
+    negate = _is_where_keyword(tokens, position, 'not')
+    if negate:
+        position += 1
+    if _is_where_keyword(tokens, position, 'in'):
+        values, position = _parse_where_list(tokens, position + 1)
+    elif not negate and position < len(tokens) and tokens[position][0] == 'op' \
+            and tokens[position][1] in ('=', '==', '!=', '<>'):
+        negate = tokens[position][1] in ('!=', '<>')
+        values, position = _parse_where_value(tokens, position + 1)
+        values = [values]
+    elif not negate and position < len(tokens) and tokens[position][0] == 'op' \
+            and tokens[position][1] in WHERE_TIME_OPERATORS:
+        operator = tokens[position][1]
+        value, position = _parse_where_value(tokens, position + 1)
+        return ('time', column, operator, get_epoch_micros(parse_timestamp(value))), position
+    else:
+        raise ValueError(f"expected a comparison after {column!r}")
+    node = ('in', column, frozenset(value.casefold() for value in values))
+    return (('not', node) if negate else node), position
+
+
+def _parse_where_list(tokens, position):
+    """Parse '(' value (',' value)* ')' for compile_where, returning (values, next position)."""
+    if position >= len(tokens) or tokens[position] != ('op', '('):
+        raise ValueError("expected '(' after 'in'")
+    values = []
+    while True:
+        value, position = _parse_where_value(tokens, position + 1)
+        values.append(value)
+        if position < len(tokens) and tokens[position] == ('op', ','):
+            continue
+        if position < len(tokens) and tokens[position] == ('op', ')'):
+            return values, position + 1
+        raise ValueError("expected ',' or ')' in value list")
+
+
+def _parse_where_value(tokens, position):
+    """Parse a bare or quoted value for compile_where, returning (value, next position)."""
+    if position >= len(tokens) or tokens[position][0] == 'op':
+        raise ValueError("expected a value")
+    return tokens[position][1], position + 1
+
+
+def parse_timestamp(value):
+    """
+    Parse one timestamp into a UTC pd.Timestamp; timestamps without a time
+    zone are taken to be UTC.
+    
+    Raises:
+        ValueError: If value is not a timestamp
+    """
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        timestamp = pd.NaT
+    if pd.isna(timestamp):
+        raise ValueError(f"{value!r} is not a timestamp")
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+def get_epoch_micros(timestamp):
+    """
+    Return a UTC pd.Timestamp as microseconds since the epoch, the unit
+    timestamps are compared in: unlike nanoseconds it covers years past 2262.
+    """
+    return int(timestamp.to_datetime64().astype('datetime64[us]').astype(np.int64))
+
+
+def parse_timestamps(values):
+    """
+    Parse a column of raw values into UTC timestamps, treating values without
+    a time zone as UTC. Values are cleaned as by clean_string_field, but with
+    vectorized string operations.
+    
+    Args:
+        values: Raw values as a list, NumPy array or Arrow array
+    
+    Returns:
+        Tuple of (microseconds, valid): int64 microseconds since the epoch and a
+        boolean array that is False where a value is missing or not a timestamp
+    """
+    if pa is not None:
+        if not isinstance(values, pa.Array):
+            values = pa.array(np.asarray(values, dtype=object), type=pa.string(), from_pandas=True)
+        values = pc.utf8_trim_whitespace(values)
+        quoted = pc.and_(pc.starts_with(values, '"'), pc.ends_with(values, '"'))
+        values = pc.if_else(quoted, pc.utf8_slice_codeunits(values, 1, -1), values)
+        values = pc.if_else(pc.equal(values, ''), pa.scalar(None, pa.string()), values)
+        # Arrow's ISO 8601 cast is much faster than pandas, but takes a column
+        # either all with or all without zone offsets and raises on anything else
+        for timestamp_type in (pa.timestamp('us', tz='UTC'), pa.timestamp('us')):
+            try:
+                timestamps = pc.cast(values, timestamp_type)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                continue
+            valid = timestamps.is_valid().to_numpy(zero_copy_only=False)
+            microseconds = pc.cast(timestamps, pa.int64()).fill_null(0)
+            return microseconds.to_numpy(zero_copy_only=False), valid
+        values = values.to_pandas()
+    else:
+        values = pd.Series(np.asarray(values, dtype=object), dtype=object).str.strip()
+        quoted = values.str.startswith('"') & values.str.endswith('"')
+        values = values.mask(quoted.fillna(False).astype(bool), values.str[1:-1])
+    values = values.mask(values == '')
+    timestamps = pd.to_datetime(values, utc=True, errors='coerce', format='ISO8601')
+    # Fall back to per-value format inference for anything that is not ISO 8601
+    retry = timestamps.isna() & values.notna()
+    if retry.any():
+        timestamps[retry] = pd.to_datetime(values[retry], utc=True, errors='coerce', format='mixed')
+    valid = timestamps.notna().to_numpy()
+    microseconds = timestamps.to_numpy(dtype='datetime64[us]', na_value=np.datetime64(0, 'us'))
+    return microseconds.astype(np.int64), valid
+
+
+def parse_time_bound(value, now):
+    """
+    Parse a --since/--until value: a timestamp, see parse_timestamp, or a
+    duration such as 7d, 12h, 30m or 2w counted back from now.
+    
+    Returns:
+        UTC pd.Timestamp
+    
+    Raises:
+        ValueError: If value is neither
+    """
+    match = match_duration(value)
+    if match:
+        return now - pd.Timedelta(seconds=int(match.group(1)) * DURATION_UNITS[match.group(2).lower()])
+    return parse_timestamp(value)
+
+
+def match_duration(value):
+    """Match a relative --since/--until duration such as 7d, returning None for anything else."""
+    return re.fullmatch(r'\s*(\d+)\s*([smhdw])\s*', value, re.IGNORECASE)
+
+
+def get_where_columns(node):
+    """Return the columns a compiled --where expression refers to, in order of appearance."""
+    if node[0] in ('in', 'time'):
+        return [node[1]]
+    children = node[1] if node[0] in ('and', 'or') else (node[1],)
+    return list(dict.fromkeys(column for child in children for column in get_where_columns(child)))
+
+
+def get_where_time_columns(node):
+    """Return the columns compared as timestamps in a compiled --where expression."""
+    if node[0] in ('in', 'time'):
+        return [node[1]] if node[0] == 'time' else []
+    children = node[1] if node[0] in ('and', 'or') else (node[1],)
+    return list(dict.fromkeys(column for child in children for column in get_where_time_columns(child)))
+
+
+def get_where_window(node):
+    """
+    Return the timestamp comparisons every row a compiled --where expression
+    selects must pass, i.e. those joined to the whole expression by 'and'.
+    """
+    if node[0] == 'time':
+        return [node]
+    if node[0] == 'and':
+        return [window for child in node[1] for window in get_where_window(child)]
+    return []
+
+
+def evaluate_where(node, columns, timestamps=None):
+    """
+    Evaluate a compiled --where expression into a boolean mask over the rows
+    of a chunk.
+    
+    Each comparison is decided once per distinct value of its column and
+    broadcast to the rows through their codes; timestamp columns are not
+    dictionary-encoded, so they come with one code per row. Values are compared after
+    clean_string_field, case-insensitively; a missing value equals nothing.
+    A sensor_types comparison matches rows having any of the listed sensor
+    types. Ordered comparisons parse the values as timestamps, see
+    parse_timestamps.
+    
+    Args:
+        node: Tree returned by compile_where
+        columns: Dict of column name to (codes, values) as passed to
+            aggregate_codes; values may also be an Arrow array or NumPy array
+        timestamps: Dict the parsed timestamp columns are kept in, so that
+            comparisons on the same column parse it only once
+    """
+    if timestamps is None:
+        timestamps = {}
+    kind = node[0]
+    if kind == 'not':
+        return ~evaluate_where(node[1], columns, timestamps)
+    if kind in ('and', 'or'):
+        masks = [evaluate_where(child, columns, timestamps) for child in node[1]]
+        return np.logical_and.reduce(masks) if kind == 'and' else np.logical_or.reduce(masks)
+    if kind == 'time':
+        _, column, operator, bound = node
+        codes, raw_values = columns[column]
+        if column not in timestamps:
+            timestamps[column] = parse_timestamps(raw_values)
+        microseconds, valid = timestamps[column]
+        compare = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal}[operator]
+        return np.append(valid & compare(microseconds, bound), False)[codes]
+    
+    _, column, values = node
+    codes, raw_values = columns[column]
+    if pa is not None and isinstance(raw_values, pa.Array):
+        raw_values = raw_values.to_pylist()
+    if column == 'sensor_types':
+        matches = [any(sensor_type.casefold() in values for sensor_type in parse_sensor_types_cached(value))
+                   for value in raw_values]
+    else:
+        matches = []
+        for value in raw_values:
+            label = clean_string_field(value)
+            matches.append(label is not None and label.casefold() in values)
+    return np.array(matches + [False], dtype=bool)[codes]
+
+
+def check_csv_header(source, columns):
+    """
+    Read the CSV header once and verify that all required columns exist.
+    Exits with an error listing the available columns if any are missing.
+    
+    Args:
+        source: Path to CSV file or binary file object positioned at the header
+        columns: Required columns
+    
+    Returns:
+        List of all column names in the header
+    """
+    available = list(pd.read_csv(source, nrows=0).columns)
+    verify_columns(available, columns)
+    return available
+
+
+def verify_columns(available, columns):
+    """Exit with an error listing the available columns if any required column is missing."""
+    missing = [column for column in columns if column not in available]
+    if missing:
+        for column in missing:
+            print(f"Error: '{column}' column not found in CSV")
+        print(f"Available columns: {available}")
+        sys.exit(1)
+
+
+class FlowCube:
+    """
+    Flow counts held as a dense NumPy count array over interned labels.
+    
+    Every dimension (sensor_type, severity, status) keeps its labels in a list
+    and a label -> id dictionary, so counts[i, j, k] is the number of alerts for
+    (labels[0][i], labels[1][j], labels[2][k]). Rows are added in bulk as id
+    arrays through np.bincount, and totals along any axis are array sums.
+    
+    Reads like the dict keyed by (sensor_type, severity, status) tuples it
+    replaces: items(), keys(), len(), iteration and lookups skip zero cells.
+    """
+    
+    def __init__(self, num_dimensions=len(FLOW_DIMENSIONS)):
+        self.labels = [[] for _ in range(num_dimensions)]
+        self.label_ids = [{} for _ in range(num_dimensions)]
+        self.counts = np.zeros((0,) * num_dimensions, dtype=np.int64)
+    
+    def intern(self, axis, labels):
+        """Return the ids of labels along axis, adding labels not seen before."""
+        axis_labels = self.labels[axis]
+        axis_ids = self.label_ids[axis]
+        ids = []
+        for label in labels:
+            label_id = axis_ids.get(label)
+            if label_id is None:
+                label_id = axis_ids[label] = len(axis_labels)
+                axis_labels.append(label)
+            ids.append(label_id)
+        self._reserve()
+        return np.array(ids, dtype=np.int64)
+    
+    def _reserve(self):
+        """Grow the count array (at least doubling an axis) to fit every interned label."""
+        shape = self.counts.shape
+        needed = tuple(len(labels) for labels in self.labels)
+        if all(n <= size for n, size in zip(needed, shape)):
+            return
+        new_shape = tuple(size if n <= size else max(n, 2 * size) for n, size in zip(needed, shape))
+        counts = np.zeros(new_shape, dtype=np.int64)
+        counts[tuple(slice(0, size) for size in shape)] = self.counts
+        self.counts = counts
+    
+    def add_ids(self, ids, counts):
+        """Add counts at the cells given by one id array per dimension."""
+        if len(counts) == 0:
+            return
+        flat = np.ravel_multi_index(tuple(ids), self.counts.shape)
+        # Weights are summed as float64, exact for any count below 2**53
+        totals = np.bincount(flat, weights=counts, minlength=self.counts.size)
+        self.counts += totals.astype(np.int64).reshape(self.counts.shape)
+    
+    def add_labels(self, label_columns, counts):
+        """Add counts for rows given as one label sequence per dimension."""
+        ids = [self.intern(axis, labels) for axis, labels in enumerate(label_columns)]
+        self.add_ids(ids, np.asarray(counts, dtype=np.int64))
+    
+    def merge(self, other):
+        """Add another FlowCube, or a dict of flow counts, into this one."""
+        if not isinstance(other, FlowCube):
+            if other:
+                self.add_labels(list(zip(*other.keys())), list(other.values()))
+            return self
+        id_maps = [self.intern(axis, labels) for axis, labels in enumerate(other.labels)]
+        cells = np.nonzero(other.counts)
+        self.add_ids([id_map[cell] for id_map, cell in zip(id_maps, cells)], other.counts[cells])
+        return self
+    
+    def marginal(self, axis):
+        """Return {label: count} totals along one dimension, omitting zero totals."""
+        other_axes = tuple(a for a in range(self.counts.ndim) if a != axis)
+        totals = self.counts.sum(axis=other_axes)
+        labels = self.labels[axis]
+        return {labels[i]: int(totals[i]) for i in np.flatnonzero(totals)}
+    
+    def rollup(self, axes):
+        """Return {label tuple: count} totals over a subset of dimensions, omitting zeros."""
+        other_axes = tuple(a for a in range(self.counts.ndim) if a not in axes)
+        totals = self.counts.sum(axis=other_axes)
+        cells = np.nonzero(totals)
+        keys = zip(*(np.array(self.labels[axis], dtype=object)[cell]
+                     for axis, cell in zip(axes, cells)))
+        return dict(zip(keys, totals[cells].tolist()))
+    
+    def items(self):
+        return self.rollup(tuple(range(self.counts.ndim))).items()
+    
+    def keys(self):
+        return self.rollup(tuple(range(self.counts.ndim))).keys()
+    
+    def values(self):
+        return self.rollup(tuple(range(self.counts.ndim))).values()
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def __len__(self):
+        return int(np.count_nonzero(self.counts))
+    
+    def __getitem__(self, key):
+        ids = []
+        for axis, label in enumerate(key):
+            label_id = self.label_ids[axis].get(label)
+            if label_id is None:
+                return 0
+            ids.append(label_id)
+        return int(self.counts[tuple(ids)])
+    
+    def __contains__(self, key):
+        return self[key] > 0
+
+
+def encode_clean_labels(values):
+    """
+    Clean each distinct raw value once with clean_string_field.
+    
+    Args:
+        values: Raw category/dictionary values of a column
+    
+    Returns:
+        Tuple of (label_codes, labels) where label_codes maps each raw value's
+        position to its index in labels, or -1 if the cleaned value is missing.
+        A trailing -1 is appended so that null codes (-1) also map to -1.
+    """
+    labels = []
+    label_index = {}
+    label_codes = []
+    for value in values:
+        label = clean_string_field(value)
+        if label is None:
+            label_codes.append(-1)
+            continue
+        if label not in label_index:
+            label_index[label] = len(labels)
+            labels.append(label)
+        label_codes.append(label_index[label])
+    label_codes.append(-1)
+    return np.array(label_codes, dtype=np.int64), labels
+
+
+def count_rows_with_sensor_types(sensor_codes, sensor_values):
+    """
+    Count the rows whose sensor_types value holds at least one sensor type,
+    which is what makes an INFO row count as excluded. Needs a (memoized)
+    parse of each distinct value, but no explode.
+    
+    Args:
+        sensor_codes: Codes of the rows to count, all >= 0
+        sensor_values: Raw value behind every code
+    """
+    codes = np.unique(sensor_codes)
+    has_sensor_types = np.zeros(len(sensor_values), dtype=bool)
+    has_sensor_types[codes] = [
+        len(parse_sensor_types_cached(sensor_values[code])) > 0 for code in codes.tolist()
+    ]
+    return int(has_sensor_types[sensor_codes].sum())
+
+
+def aggregate_codes(sensor_codes, sensor_values, severity_codes, severity_values,
+                    status_codes, status_values, exclude_info=False, row_mask=None):
+    """
+    Aggregate dictionary-encoded columns into sensor_type → severity → status flow counts.
+    
+    Each column is given as integer codes per row (-1 for missing) plus the raw
+    value behind every code. Filters run first, on the cheap severity and
+    status labels, so that rows they drop never reach the sensor_types parse.
+    Labels are cleaned once per distinct value, and only the distinct
+    sensor_types values of the remaining rows are exploded as a column (see
+    explode_sensor_types). Rows are counted on the integer codes, and the
+    distinct code combinations are expanded into sensor types with array
+    indexing.
+    
+    Args:
+        row_mask: Optional boolean array of the rows to keep (see
+            evaluate_where); rows outside it are neither counted nor excluded
+    
+    Returns:
+        Tuple of (flow_counts, excluded_rows) where flow_counts is a FlowCube
+    """
+    with profile_stage('filter'):
+        severity_label_codes, severities = encode_clean_labels(severity_values)
+        status_label_codes, statuses = encode_clean_labels(status_values)
+        severity_ids = severity_label_codes[severity_codes]
+        status_ids = status_label_codes[status_codes]
+        
+        # Skip rows with missing critical fields
+        valid = (sensor_codes >= 0) & (severity_ids >= 0) & (status_ids >= 0)
+        if row_mask is not None:
+            valid &= row_mask
+        
+        # Skip INFO severity if exclude_info is True
+        excluded_rows = 0
+        if exclude_info:
+            is_info = np.array([s.upper() == 'INFO' for s in severities] + [False])
+            info = valid & is_info[severity_ids]
+            valid &= ~info
+            excluded_rows = count_rows_with_sensor_types(sensor_codes[info], sensor_values)
+    
+    with profile_stage('parse'):
+        # Explode only the sensor_types values the remaining rows refer to
+        used_codes = np.unique(sensor_codes[valid])
+        value_index, exploded_sensor_types = explode_sensor_types(
+            [sensor_values[code] for code in used_codes.tolist()]
+        )
+        used_counts = np.bincount(value_index, minlength=len(used_codes))
+        sensor_type_counts = np.zeros(len(sensor_values), dtype=np.int64)
+        sensor_type_counts[used_codes] = used_counts
+        sensor_type_starts = np.zeros(len(sensor_values), dtype=np.int64)
+        sensor_type_starts[used_codes] = np.cumsum(used_counts) - used_counts
+        valid &= np.append(sensor_type_counts > 0, False)[sensor_codes]
+    
+    with profile_stage('aggregate'):
+        num_severities = max(len(severities), 1)
+        num_statuses = max(len(statuses), 1)
+        keys = (sensor_codes[valid] * num_severities + severity_ids[valid]) * num_statuses + status_ids[valid]
+        keys, counts = np.unique(keys, return_counts=True)
+        sensor_codes, rest = np.divmod(keys, num_severities * num_statuses)
+        severity_ids, status_ids = np.divmod(rest, num_statuses)
+        
+        # Expand each distinct combination into one cell per sensor type: the
+        # exploded entries of value v are sensor_type_starts[v] onwards
+        flow_counts = FlowCube()
+        repeats = sensor_type_counts[sensor_codes]
+        ends = np.cumsum(repeats)
+        entries = np.repeat(sensor_type_starts[sensor_codes] - (ends - repeats), repeats)
+        entries += np.arange(len(entries), dtype=np.int64)
+        sensor_type_ids = flow_counts.intern(0, exploded_sensor_types[entries])
+        severity_ids = flow_counts.intern(1, severities)[severity_ids]
+        status_ids = flow_counts.intern(2, statuses)[status_ids]
+        flow_counts.add_ids(
+            [sensor_type_ids, np.repeat(severity_ids, repeats), np.repeat(status_ids, repeats)],
+            np.repeat(counts, repeats)
+        )
+    return flow_counts, excluded_rows
+
+
+def aggregate_chunk(chunk, exclude_info=False, where=None):
+    """
+    Aggregate one chunk into sensor_type → severity → status flow counts.
+    
+    Args:
+        chunk: DataFrame holding the sensor_types, severity and status columns
+            (and any columns the --where expression refers to) as categoricals,
+            except for plain timestamp columns (see get_dictionary_columns)
+        exclude_info: If True, exclude rows with severity="INFO"
+        where: Optional --where expression selecting the rows to aggregate
+    
+    Returns:
+        Tuple of (flow_counts, excluded_rows, rows), see aggregate_codes and
+        filter_encoded
+    """
+    encoded = {}
+    with profile_stage('parse'):
+        columns = get_required_columns(where=where)
+        dictionary_columns = get_dictionary_columns(columns, where)
+        for column in columns:
+            values = chunk[column]
+            if column not in dictionary_columns and not isinstance(values.dtype, pd.CategoricalDtype):
+                # One code per row, so the values are parsed as a whole column
+                encoded[column] = (np.arange(len(values)), values.to_numpy(dtype=object))
+                continue
+            values = values.astype('category')
+            encoded[column] = (values.cat.codes.to_numpy(dtype=np.int64), values.cat.categories.tolist())
+    return aggregate_encoded(encoded, exclude_info, where)
+
+
+def aggregate_batch(batch, exclude_info=False, where=None):
+    """
+    Aggregate one Arrow record batch into sensor_type → severity → status flow counts.
+    
+    Args:
+        batch: RecordBatch holding the sensor_types, severity and status columns
+            (and any columns the --where expression refers to) as dictionary
+            arrays, except for plain timestamp columns (see get_dictionary_columns)
+        exclude_info: If True, exclude rows with severity="INFO"
+        where: Optional --where expression selecting the rows to aggregate
+    
+    Returns:
+        Tuple of (flow_counts, excluded_rows, rows), see aggregate_codes and
+        filter_encoded
+    """
+    encoded = {}
+    with profile_stage('parse'):
+        columns = get_required_columns(where=where)
+        dictionary_columns = get_dictionary_columns(columns, where)
+        for column in columns:
+            encoded[column] = encode_arrow_column(
+                batch.column(column), column in dictionary_columns
+            )
+    return aggregate_encoded(encoded, exclude_info, where)
+
+
+def encode_arrow_column(values, dictionary=True):
+    """
+    Split an Arrow column into per-row codes and the values they index.
+    
+    Args:
+        values: Arrow array, dictionary-encoded or plain
+        dictionary: If False, a plain column is kept as one code per row
+            (see get_dictionary_columns) instead of being dictionary-encoded
+    
+    Returns:
+        Tuple of (int64 codes with -1 for null, values)
+    """
+    if not pa.types.is_dictionary(values.type):
+        if not dictionary:
+            # One code per row, so the values are parsed as a whole column
+            return np.arange(len(values)), values
+        values = values.dictionary_encode()
+    return (
+        values.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64),
+        values.dictionary.to_pylist(),
+    )
+
+
+def aggregate_encoded(encoded, exclude_info=False, where=None):
+    """
+    Filter and aggregate dictionary-encoded columns, given as a dict of column
+    name to (codes, values), with aggregate_codes.
+    
+    Returns:
+        Tuple of (flow_counts, excluded_rows, rows), see filter_encoded
+    """
+    row_mask, rows = filter_encoded(encoded, where)
+    flow_counts, excluded_rows = aggregate_codes(
+        *[part for column in FLOW_DIMENSIONS for part in encoded[column]],
+        exclude_info=exclude_info, row_mask=row_mask
+    )
+    return flow_counts, excluded_rows, rows
+
+
+def filter_encoded(encoded, where=None):
+    """
+    Evaluate a --where expression over dictionary-encoded columns.
+    
+    Rows outside the time window of the expression (see get_where_window),
+    such as the --since/--until bounds, are not counted as read: how many of
+    them a scan reads depends on the file layout, not on the data.
+    
+    Returns:
+        Tuple of (row_mask, rows) where row_mask is None without where, and
+        rows is the number of rows inside the time window
+    """
+    rows = len(encoded['severity'][0])
+    if not where:
+        return None, rows
+    with profile_stage('filter'):
+        node = compile_where(where)
+        timestamps = {}
+        window = get_where_window(node)
+        if window:
+            rows = int(np.count_nonzero(evaluate_where(('and', tuple(window)), encoded, timestamps)))
+        return evaluate_where(node, encoded, timestamps), rows
+
+
+def get_dictionary_columns(columns, where=None):
+    """
+    Return the columns to read dictionary-encoded: all of them except the
+    timestamp columns of ordered --where comparisons, which are nearly unique
+    per row and are parsed as a whole column instead (see parse_timestamps).
+    """
+    time_columns = get_where_time_columns(compile_where(where)) if where else []
+    return [column for column in columns if column in FLOW_DIMENSIONS or column not in time_columns]
+
+
+def get_pandas_dtypes(columns, where=None):
+    """Return the pd.read_csv dtypes of columns: categoricals, see get_dictionary_columns."""
+    dictionary_columns = get_dictionary_columns(columns, where)
+    return {column: 'category' if column in dictionary_columns else object for column in columns}
+
+
+def read_arrow_batches(source, columns, column_names=None, use_mmap=False,
+                       block_size=ARROW_BLOCK_SIZE, where=None):
+    """
+    Stream the CSV as Arrow record batches using pyarrow's multithreaded reader.
+    Only the given columns are converted, as dictionary-encoded strings except
+    for the timestamp columns of where (see get_dictionary_columns).
+    
+    Args:
+        source: Path to CSV file or binary file object
+        columns: Columns to convert
+        column_names: Header to use when source starts after the header row
+        use_mmap: If True and source is a path, read it through a memory map
+    """
+    dictionary_columns = get_dictionary_columns(columns, where)
+    if isinstance(source, (str, Path)):
+        source = pa.memory_map(str(source)) if use_mmap else str(source)
+    return pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(
+            block_size=block_size, use_threads=True, column_names=column_names
+        ),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={
+                column: pa.dictionary(pa.int32(), pa.string()) if column in dictionary_columns
+                else pa.string()
+                for column in columns
+            },
+            null_values=CSV_NULL_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def open_chunk_reader(source, columns, chunk_size=100000, engine='pandas', column_names=None,
+                      use_mmap=False, max_memory=None, where=None):
+    """
+    Open a chunked reader over a CSV path or binary file object.
+    
+    Args:
+        source: Path to CSV file or binary file object
+        columns: Columns to materialize
+        chunk_size: Number of rows per chunk (pandas engine)
+        engine: 'pandas' or 'pyarrow'
+        column_names: Header to use when source starts after the header row
+        use_mmap: If True and source is a path, read it through a memory map
+        max_memory: Memory budget in bytes. Replaces chunk_size with chunks
+            sized to the budget (pandas), or sizes the Arrow blocks (pyarrow)
+        where: Optional --where expression; its timestamp columns are read as
+            plain strings (see get_dictionary_columns)
+    
+    Returns:
+        Tuple of (chunk_iter, aggregate) where aggregate is the aggregate_chunk or
+        aggregate_batch function matching the chunks
+    """
+    if engine == 'pyarrow':
+        block_size = get_arrow_block_size(max_memory) if max_memory else ARROW_BLOCK_SIZE
+        return (read_arrow_batches(source, columns, column_names, use_mmap, block_size, where),
+                aggregate_batch)
+    if max_memory:
+        return (read_adaptive_chunks(source, columns, max_memory, column_names, use_mmap, where),
+                aggregate_chunk)
+    chunk_iter = pd.read_csv(
+        source,
+        chunksize=chunk_size,
+        usecols=columns,
+        dtype=get_pandas_dtypes(columns, where),
+        names=column_names,
+        header=None if column_names else 'infer',
+        memory_map=use_mmap and isinstance(source, (str, Path)),
+    )
+    return chunk_iter, aggregate_chunk
+
+
+def parse_memory_size(value):
+    """
+    Parse a memory size such as '2G', '512M', '1.5GB' or '1073741824' into bytes.
+    
+    Raises:
+        ValueError: If value is not a positive size
+    """
+    text = str(value).strip().upper()
+    if text.endswith('B'):
+        text = text[:-1]
+    unit = text[-1:] if text[-1:] in MEMORY_UNITS else ''
+    size = float(text[:len(text) - len(unit)]) * MEMORY_UNITS[unit]
+    if not math.isfinite(size):
+        raise ValueError(f"invalid memory size: {value}")
+    size = int(size)
+    if size <= 0:
+        raise ValueError(f"invalid memory size: {value}")
+    return size
+
+
+def parse_worker_count(value):
+    """
+    Parse a --workers count.
+    
+    Raises:
+        ValueError: If value is not an integer of at least 1
+    """
+    workers = int(value)
+    if workers < 1:
+        raise ValueError(f"invalid worker count: {value}")
+    return workers
+
+
+def format_memory_size(size):
+    """Format a byte count for display, e.g. 2.0 GB."""
+    for unit in ('TB', 'GB', 'MB', 'KB'):
+        scale = MEMORY_UNITS[unit[0]]
+        if size >= scale:
+            return f"{size / scale:.1f} {unit}"
+    return f"{size} bytes"
+
+
+def get_arrow_block_size(max_memory):
+    """Return the pyarrow block size for a memory budget, between 1 MB and 256 MB."""
+    return int(min(max(max_memory * ARROW_BLOCK_MEMORY_SHARE, 1024 ** 2), 256 * 1024 ** 2))
+
+
+class CountingReader(io.RawIOBase):
+    """Raw binary reader passing reads through to another file object while counting the bytes."""
+    
+    def __init__(self, source):
+        super().__init__()
+        self._source = source
+        self.bytes_read = 0
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self._source.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+
+def read_adaptive_chunks(source, columns, max_memory, column_names=None, use_mmap=False, where=None):
+    """
+    Yield pandas chunks sized to stay within a memory budget.
+    
+    A first chunk of ADAPTIVE_PROBE_ROWS rows measures the working set per
+    row: the CSV text consumed (times PARSER_MEMORY_FACTOR for the tokenizer)
+    plus the materialized columns. Every following chunk is sized from the
+    latest measurement to fit max_memory, growing at most ADAPTIVE_MAX_GROWTH
+    times per chunk, so narrow exports get large chunks and wide ones small.
+    
+    Args:
+        source: Path to CSV file or binary file object
+        columns: Columns to materialize
+        max_memory: Memory budget in bytes for one chunk
+        column_names: Header to use when source starts after the header row
+        use_mmap: If True and source is a path, read it through a memory map
+        where: Optional --where expression, see open_chunk_reader
+    """
+    opened = None
+    if isinstance(source, (str, Path)):
+        source = opened = ByteRangeReader(source, 0, os.path.getsize(source), use_mmap)
+    counter = CountingReader(source)
+    try:
+        reader = pd.read_csv(
+            counter,
+            iterator=True,
+            usecols=columns,
+            dtype=get_pandas_dtypes(columns, where),
+            names=column_names,
+            header=None if column_names else 'infer',
+        )
+        with reader:
+            rows = ADAPTIVE_PROBE_ROWS
+            while True:
+                bytes_before = counter.bytes_read
+                try:
+                    chunk = reader.get_chunk(rows)
+                except StopIteration:
+                    return
+                if len(chunk):
+                    text_bytes = counter.bytes_read - bytes_before
+                    chunk_bytes = int(chunk.memory_usage(index=False, deep=True).sum())
+                    bytes_per_row = max((text_bytes * PARSER_MEMORY_FACTOR + chunk_bytes) / len(chunk), 1)
+                    rows = int(min(max(max_memory / bytes_per_row, ADAPTIVE_PROBE_ROWS),
+                                   rows * ADAPTIVE_MAX_GROWTH))
+                yield chunk
+    finally:
+        if opened is not None:
+            opened.close()
+
+
+def scan_chunks(chunk_iter, aggregate, flow_counts, exclude_info=False, show_progress=True,
+                where=None):
+    """
+    Aggregate every chunk of a reader into flow_counts.
+    
+    Returns:
+        Tuple of (total_rows, excluded_rows)
+    """
+    total_rows = 0
+    excluded_rows = 0
+    chunk_start = time.perf_counter()
+    for chunk_num, chunk in enumerate(profile_iter(chunk_iter, 'read'), 1):
+        if show_progress:
+            print(f"Processing chunk {chunk_num} ({len(chunk):,} rows)...", end='\r')
+        
+        chunk_flows, chunk_excluded, chunk_rows = aggregate(
+            chunk, exclude_info=exclude_info, where=where
+        )
+        total_rows += chunk_rows
+        excluded_rows += chunk_excluded
+        
+        # Fold the chunk's flow counts into the running totals
+        with profile_stage('aggregate'):
+            flow_counts.merge(chunk_flows)
+        
+        chunk_end = time.perf_counter()
+        record_chunk_metrics(chunk, chunk_end - chunk_start)
+        chunk_start = chunk_end
+        
+        if show_progress and chunk_num % 10 == 0:
+            print(f"\nProcessed {chunk_num} chunks ({total_rows:,} rows total)")
+    return total_rows, excluded_rows
+
+
+def map_file(csv_path):
+    """Memory-map a file read-only. The mapping stays valid after the file is closed."""
+    with open(csv_path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ByteRangeReader(io.RawIOBase):
+    """Raw binary reader that exposes only bytes [start, end) of a file."""
+    
+    def __init__(self, path, start, end, use_mmap=False):
+        super().__init__()
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if use_mmap else None
+        self._file.seek(start)
+        self._position = start
+        self._end = end
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        size = min(len(buffer), self._end - self._position)
+        if size <= 0:
+            return 0
+        if self._map is not None:
+            # Copy straight from the shared page cache into the parser's buffer
+            with memoryview(buffer) as target, memoryview(self._map) as mapped:
+                target[:size] = mapped[self._position:self._position + size]
+        else:
+            size = self._file.readinto(memoryview(buffer)[:size])
+        self._position += size
+        return size
+    
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+        super().close()
+
+
+def open_byte_range(csv_path, start, end, engine='pandas', use_mmap=False):
+    """Open bytes [start, end) of the CSV as a binary file object."""
+    if use_mmap and engine == 'pyarrow':
+        # Zero-copy slice of the mapping, parsed directly by Arrow
+        return pa.BufferReader(pa.memory_map(str(csv_path)).read_at(end - start, start))
+    return io.BufferedReader(ByteRangeReader(csv_path, start, end, use_mmap), SCAN_BLOCK_SIZE)
+
+
+def count_quotes(task):
+    """Count the double quote bytes in one byte range. Runs in a worker process."""
+    csv_path, start, end, use_mmap = task
+    quotes = 0
+    if use_mmap:
+        with map_file(csv_path) as mapped:
+            view = np.frombuffer(mapped, dtype=np.uint8)
+            for block_start in range(start, end, SCAN_BLOCK_SIZE):
+                block_end = min(block_start + SCAN_BLOCK_SIZE, end)
+                quotes += int(np.count_nonzero(view[block_start:block_end] == QUOTE_BYTE))
+            del view
+        return quotes
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(SCAN_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            quotes += block.count(b'"')
+            remaining -= len(block)
+    return quotes
+
+
+def find_record_start(csv_path, offset, in_quotes=False, use_mmap=False):
+    """
+    Find the first record boundary after a byte offset.
+    
+    Quotes are counted from the offset so that newlines embedded in quoted
+    fields are skipped; the caller supplies whether the offset itself lies
+    inside a quoted field.
+    
+    Returns:
+        Offset just past the first unquoted newline, or the file size if none
+    """
+    if use_mmap:
+        with map_file(csv_path) as mapped:
+            view = np.frombuffer(mapped, dtype=np.uint8)
+            position = offset
+            while True:
+                newline = mapped.find(b'\n', position)
+                if newline < 0:
+                    record_start = len(mapped)
+                    break
+                in_quotes ^= bool(np.count_nonzero(view[position:newline] == QUOTE_BYTE) & 1)
+                if not in_quotes:
+                    record_start = newline + 1
+                    break
+                position = newline + 1
+            del view
+        return record_start
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        position = offset
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                return position
+            start = 0
+            while True:
+                newline = block.find(b'\n', start)
+                if newline < 0:
+                    in_quotes ^= bool(block.count(b'"', start) & 1)
+                    break
+                in_quotes ^= bool(block.count(b'"', start, newline) & 1)
+                if not in_quotes:
+                    return position + newline + 1
+                start = newline + 1
+            position += len(block)
+
+
+def find_last_record_end(csv_path, start, end):
+    """
+    Find the end of the last complete record in bytes [start, end).
+    
+    start must be a record boundary. Quotes are counted over the range once,
+    then the range is walked backwards to the last newline outside a quoted
+    field, so a partially written trailing record is left out.
+    
+    Returns:
+        Offset just past the last complete record, or start if there is none
+    """
+    quotes = count_quotes((csv_path, start, end, False))
+    with open(csv_path, 'rb') as f:
+        position = end
+        quotes_after = 0
+        while position > start:
+            block_start = max(start, position - SCAN_BLOCK_SIZE)
+            f.seek(block_start)
+            block = f.read(position - block_start)
+            search_end = len(block)
+            while True:
+                newline = block.rfind(b'\n', 0, search_end)
+                if newline < 0:
+                    quotes_after += block.count(b'"', 0, search_end)
+                    break
+                quotes_after += block.count(b'"', newline + 1, search_end)
+                if (quotes - quotes_after) % 2 == 0:
+                    return block_start + newline + 1
+                search_end = newline
+            position = block_start
+    return start
+
+
+def is_complete_record(csv_path, start, end, num_columns):
+    """
+    Return True if bytes [start, end), which hold no record boundary, form one
+    complete record: its quotes are balanced and it parses to num_columns fields.
+    Used for a final record that is not followed by a newline.
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if data.count(b'"') % 2:
+        return False
+    try:
+        records = list(csv.reader(io.StringIO(data.decode('utf-8'), newline='')))
+    except (UnicodeDecodeError, csv.Error):
+        return False
+    return len(records) == 1 and len(records[0]) == num_columns
+
+
+def split_byte_ranges(csv_path, num_ranges, executor, use_mmap=False, data_start=None, data_end=None):
+    """
+    Split the data section of a CSV into byte ranges aligned to record boundaries.
+    
+    The file is cut at even offsets, the quotes in each piece are counted in
+    parallel to know whether a cut lands inside a quoted field, and every cut
+    is then moved forward to the next record boundary.
+    
+    Args:
+        data_start: Record boundary to start at (default: just after the header)
+        data_end: Record boundary to stop at (default: end of file)
+    
+    Returns:
+        List of non-empty (start, end) byte ranges covering every data record
+    """
+    if data_start is None:
+        data_start = find_record_start(csv_path, 0, use_mmap=use_mmap)
+    if data_end is None:
+        data_end = os.path.getsize(csv_path)
+    num_ranges = max(1, min(num_ranges, (data_end - data_start) // MIN_RANGE_SIZE))
+    cuts = [data_start + i * (data_end - data_start) // num_ranges for i in range(num_ranges + 1)]
+    
+    pieces = [(csv_path, cuts[i], cuts[i + 1], use_mmap) for i in range(num_ranges)]
+    quote_counts = list(executor.map(count_quotes, pieces))
+    
+    boundaries = [data_start]
+    quotes = 0
+    for cut, piece_quotes in zip(cuts[1:-1], quote_counts):
+        quotes += piece_quotes
+        boundaries.append(find_record_start(csv_path, cut, bool(quotes & 1), use_mmap))
+    boundaries.append(data_end)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def read_timestamp_at(f, offset, file_size, column_names, time_index):
+    """
+    Find the first record starting at or after a byte offset and read its timestamp.
+    
+    Since quoted fields may contain newlines, a newline is only taken as a
+    record start when the TIME_SAMPLE_RECORDS records that follow it parse
+    with the header's number of fields and a valid timestamp.
+    
+    Args:
+        f: Binary file object of the CSV
+        offset: Byte offset to search from; must not lie in the header
+        file_size: Size of the file
+        column_names: Header column names
+        time_index: Position of the timestamp column
+    
+    Returns:
+        Tuple of (record_start, microseconds) or None if no record was found
+    """
+    window = TIME_SAMPLE_WINDOW
+    while True:
+        f.seek(offset)
+        block = f.read(window)
+        at_eof = offset + len(block) >= file_size
+        position = block.find(b'\n')
+        while position >= 0:
+            timestamp = _parse_time_sample(block[position + 1:], at_eof, len(column_names), time_index)
+            if timestamp is not None:
+                return offset + position + 1, timestamp
+            position = block.find(b'\n', position + 1)
+        if at_eof or window >= TIME_SAMPLE_MAX_WINDOW:
+            return None
+        window *= 2
+
+
+def _parse_time_sample(data, at_eof, num_columns, time_index):
+    """Return the timestamp of the first record in data if it starts a valid run of records."""
+    reader = csv.reader(io.StringIO(data.decode('utf-8', errors='replace'), newline=''))
+    records = []
+    try:
+        for record in reader:
+            records.append(record)
+            if len(records) > TIME_SAMPLE_RECORDS:
+                break
+    except csv.Error:
+        return None
+    if not at_eof:
+        # The last record read may have been cut off by the end of the block
+        records = records[:-1]
+    if not records or (not at_eof and len(records) < TIME_SAMPLE_RECORDS):
+        return None
+    timestamps = []
+    for record in records:
+        if len(record) != num_columns:
+            return None
+        try:
+            timestamps.append(get_epoch_micros(parse_timestamp(clean_string_field(record[time_index]))))
+        except ValueError:
+            return None
+    return timestamps[0]
+
+
+def find_time_range(csv_path, column_names, time_column, since=None, until=None):
+    """
+    Find the byte range of a CSV sorted by time that holds the records in [since, until).
+    
+    The sort order is read off evenly spaced samples, then each bound is
+    binary-searched on sampled record starts. The range is widened by
+    TIME_RANGE_MARGIN on both sides, so records slightly out of order near
+    the bounds are still read; the exact filter is applied by the scan.
+    
+    Args:
+        since, until: Bounds in microseconds since the epoch, or None for open ends
+    
+    Returns:
+        Tuple of record boundaries (data_start, data_end), or None if the file
+        does not look sorted by time
+    """
+    file_size = os.path.getsize(csv_path)
+    data_start = find_record_start(csv_path, 0)
+    time_index = column_names.index(time_column)
+    with open(csv_path, 'rb') as f:
+        def sample(offset):
+            # The record starting exactly at data_start is preceded by the header's newline
+            return read_timestamp_at(f, max(offset, data_start) - 1, file_size, column_names, time_index)
+        
+        span = file_size - data_start
+        samples = dict(filter(None, (sample(data_start + i * span // TIME_SORT_SAMPLES)
+                                     for i in range(TIME_SORT_SAMPLES))))
+        timestamps = [samples[start] for start in sorted(samples)]
+        if len(timestamps) < 2:
+            return data_start, file_size
+        steps = np.diff(timestamps)
+        if (steps >= 0).all():
+            ascending = True
+        elif (steps <= 0).all():
+            ascending = False
+        else:
+            return None
+        
+        def search(bound, past):
+            """Return offsets (lo, hi) around the first record start whose timestamp is past bound."""
+            lo, hi = data_start, file_size
+            while hi - lo > TIME_SEARCH_RESOLUTION:
+                mid = (lo + hi) // 2
+                found = sample(mid)
+                if found is None or found[0] >= hi or past(found[1]):
+                    hi = mid
+                else:
+                    lo = found[0]
+            return lo, hi
+        
+        first, last = (since, until) if ascending else (until, since)
+        start = data_start
+        if first is not None:
+            lo, _ = search(first, (lambda ts: ts >= first) if ascending else (lambda ts: ts < first))
+            found = sample(lo - TIME_RANGE_MARGIN) if lo - TIME_RANGE_MARGIN > data_start else None
+            start = found[0] if found is not None else data_start
+        end = file_size
+        if last is not None:
+            _, hi = search(last, (lambda ts: ts >= last) if ascending else (lambda ts: ts < last))
+            found = sample(hi + TIME_RANGE_MARGIN)
+            end = found[0] if found is not None else file_size
+    return start, max(start, end)
+
+
+def scan_byte_range(csv_path, start, end, column_names, columns, chunk_size=100000,
+                    exclude_info=False, engine='pandas', use_mmap=False, parquet_path=None,
+                    show_progress=False, max_memory=None, where=None):
+    """
+    Aggregate the records in one byte range of the CSV. Runs in a worker process.
+    
+    Args:
+        parquet_path: If given, the range's chunks are also written to this
+            Parquet file while they are aggregated
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    flow_counts = FlowCube()
+    with open_byte_range(csv_path, start, end, engine, use_mmap) as source:
+        chunk_iter, aggregate = open_chunk_reader(
+            source, columns, chunk_size, engine, column_names, max_memory=max_memory, where=where
+        )
+        if parquet_path is not None:
+            chunk_iter = write_parquet_part(chunk_iter, parquet_path, columns)
+        total_rows, excluded_rows = scan_chunks(
+            chunk_iter, aggregate, flow_counts, exclude_info=exclude_info, show_progress=show_progress,
+            where=where
+        )
+    return flow_counts, total_rows, excluded_rows
+
+
+def run_worker_task(collect_metrics, function, *args, **kwargs):
+    """
+    Run one scan task in a worker process.
+    
+    Args:
+        collect_metrics: If True, the task's stages and chunks are recorded
+            as for --metrics-json and returned in the report
+        function: Scan function called with the remaining arguments
+    
+    Returns:
+        Tuple of (result, report): the task's result and a dict of the
+        worker's statistics for the task, to be passed to unwrap_worker_result
+    """
+    global _metrics
+    saved_metrics = _metrics
+    _metrics = RunMetrics() if collect_metrics else None
+    before = _parse_sensor_types_memo.cache_info()
+    try:
+        result = function(*args, **kwargs)
+        after = _parse_sensor_types_memo.cache_info()
+        report = {
+            'pid': os.getpid(),
+            'parse_cache_hits': after.hits - before.hits,
+            'parse_cache_misses': after.misses - before.misses,
+        }
+        if collect_metrics:
+            report['metrics'] = {
+                'stages': _metrics.stages,
+                'chunks': _metrics.chunks,
+                'peak_rss_mb': get_peak_rss_mb(include_children=False),
+            }
+    finally:
+        _metrics = saved_metrics
+    return result, report
+
+
+def unwrap_worker_result(outcome):
+    """Keep the report of a run_worker_task outcome for the end of the run and return its result."""
+    result, report = outcome
+    _worker_reports.append(report)
+    if _metrics is not None and 'metrics' in report:
+        _metrics.merge_worker(report['pid'], report['metrics'])
+    return result
+
+
+def scan_parallel(csv_path, column_names, columns, chunk_size, exclude_info, engine, workers,
+                  use_mmap=False, parquet_dir=None, data_start=None, data_end=None, max_memory=None,
+                  where=None):
+    """
+    Aggregate the CSV in a process pool, one newline-aligned byte range per task,
+    and merge the partial flow counts.
+    
+    Args:
+        parquet_dir: If given, each range is also written to a Parquet part
+            file in this directory
+        data_start, data_end: Record boundaries limiting the scan, see
+            split_byte_ranges
+        max_memory: Memory budget in bytes, shared evenly by the workers
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    flow_counts = FlowCube()
+    total_rows = 0
+    excluded_rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ranges = split_byte_ranges(csv_path, workers, executor, use_mmap, data_start, data_end)
+        futures = [
+            executor.submit(
+                run_worker_task, _metrics is not None, scan_byte_range, csv_path, start, end,
+                column_names, columns, chunk_size, exclude_info, engine, use_mmap,
+                parquet_path=get_parquet_part_path(parquet_dir, range_num) if parquet_dir else None,
+                max_memory=max_memory // workers if max_memory else None, where=where,
+            )
+            for range_num, (start, end) in enumerate(ranges)
+        ]
+        for range_num, future in enumerate(futures, 1):
+            range_flows, range_rows, range_excluded = unwrap_worker_result(future.result())
+            flow_counts.merge(range_flows)
+            total_rows += range_rows
+            excluded_rows += range_excluded
+            print(f"Processed byte range {range_num}/{len(futures)} ({total_rows:,} rows total)")
+    return flow_counts, total_rows, excluded_rows
+
+
+def get_parquet_cache_path(csv_path, columns, cache_dir):
+    """
+    Return the Parquet cache directory for a CSV file.
+    
+    The cache is keyed on the file's resolved path, size and modification time
+    plus the projected columns, so any change to the export starts a new cache.
+    """
+    stat = os.stat(csv_path)
+    key = '\0'.join([str(Path(csv_path).resolve()), str(stat.st_size), str(stat.st_mtime_ns)] + list(columns))
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return Path(cache_dir) / f"{Path(csv_path).name}-{digest}.parquet"
+
+
+def get_parquet_part_path(parquet_dir, part_num):
+    """Return the path of one part file inside a Parquet cache directory."""
+    return Path(parquet_dir) / f"part-{part_num:05d}.parquet"
+
+
+def write_parquet_part(chunk_iter, part_path, columns):
+    """
+    Yield the chunks of a reader unchanged while appending them to a Parquet file.
+    Columns are stored as strings, which Parquet dictionary-encodes on disk.
+    
+    The INFO rows of each chunk are written as row groups of their own, one
+    per raw spelling of the severity, so that their statistics let
+    --exclude-info skip them (see is_info_row_group).
+    """
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    with pq.ParquetWriter(str(part_path), schema) as writer:
+        for chunk in chunk_iter:
+            if isinstance(chunk, pd.DataFrame):
+                table = pa.Table.from_pandas(chunk[columns], preserve_index=False)
+            else:
+                table = pa.Table.from_batches([chunk])
+            table = table.select(columns).cast(schema)
+            severity = table.column('severity')
+            info_values = [
+                value for value in pc.unique(severity).to_pylist()
+                if (clean_string_field(value) or '').upper() == 'INFO'
+            ]
+            if info_values:
+                is_info = pc.is_in(severity, value_set=pa.array(info_values, pa.string()))
+                rest = table.filter(pc.invert(is_info.fill_null(False)))
+                if rest.num_rows:
+                    writer.write_table(rest)
+                for value in info_values:
+                    writer.write_table(table.filter(pc.equal(severity, value)))
+            else:
+                writer.write_table(table)
+            yield chunk
+
+
+def is_info_row_group(parquet_file, row_group):
+    """
+    Return the raw severity value if the row group's Parquet statistics prove
+    that every row in it has INFO severity, else None.
+    """
+    column = parquet_file.schema_arrow.get_field_index('severity')
+    if column < 0:
+        return None
+    stats = parquet_file.metadata.row_group(row_group).column(column).statistics
+    if stats is None or not stats.has_min_max or not stats.has_null_count or stats.null_count:
+        return None
+    severity = clean_string_field(stats.min)
+    if stats.min != stats.max or severity is None or severity.upper() != 'INFO':
+        return None
+    return stats.min
+
+
+def count_info_row_group(parquet_file, row_group, info_value, columns, where=None):
+    """
+    Count the rows of a row group that holds only INFO severity, and how many
+    of them --exclude-info excludes, from the dictionary-encoded sensor_types
+    and status columns (and any --where columns) without aggregating them.
+    
+    Returns:
+        Tuple of (rows, excluded_rows), with rows counted as in filter_encoded
+    """
+    table = parquet_file.read_row_group(
+        row_group, columns=[column for column in columns if column != 'severity']
+    )
+    encoded = {'severity': (np.zeros(table.num_rows, dtype=np.int64), [info_value])}
+    dictionary_columns = get_dictionary_columns(columns, where)
+    for column in table.column_names:
+        encoded[column] = encode_arrow_column(
+            table.column(column).combine_chunks(), column in dictionary_columns
+        )
+    sensor_codes, sensor_values = encoded['sensor_types']
+    status_codes, status_values = encoded['status']
+    status_ids = encode_clean_labels(status_values)[0][status_codes]
+    valid = (sensor_codes >= 0) & (status_ids >= 0)
+    row_mask, rows = filter_encoded(encoded, where)
+    if row_mask is not None:
+        valid &= row_mask
+    return rows, count_rows_with_sensor_types(sensor_codes[valid], sensor_values)
+
+
+def scan_parquet_part(part_path, columns, chunk_size=100000, exclude_info=False, where=None):
+    """
+    Aggregate one Parquet cache part file, reading the columns dictionary-encoded.
+    
+    With exclude_info, row groups whose statistics show nothing but INFO
+    severity are only counted (see count_info_row_group), never aggregated.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    flow_counts = FlowCube()
+    parquet_file = pq.ParquetFile(str(part_path), read_dictionary=get_dictionary_columns(columns, where))
+    total_rows = 0
+    excluded_rows = 0
+    row_groups = []
+    for row_group in range(parquet_file.num_row_groups):
+        info_value = is_info_row_group(parquet_file, row_group) if exclude_info else None
+        if info_value is None:
+            row_groups.append(row_group)
+            continue
+        with profile_stage('filter'):
+            group_rows, group_excluded = count_info_row_group(
+                parquet_file, row_group, info_value, columns, where
+            )
+        total_rows += group_rows
+        excluded_rows += group_excluded
+    if row_groups:
+        chunk_iter = parquet_file.iter_batches(batch_size=chunk_size, row_groups=row_groups,
+                                               columns=columns)
+        scanned_rows, scanned_excluded = scan_chunks(
+            chunk_iter, aggregate_batch, flow_counts, exclude_info=exclude_info,
+            show_progress=False, where=where
+        )
+        total_rows += scanned_rows
+        excluded_rows += scanned_excluded
+    return flow_counts, total_rows, excluded_rows
+
+
+def scan_parquet_cache(cache_path, columns, chunk_size=100000, exclude_info=False, workers=1,
+                       where=None):
+    """
+    Aggregate a Parquet cache directory, one part file per task when workers > 1.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    part_paths = sorted(Path(cache_path).glob('part-*.parquet'))
+    flow_counts = FlowCube()
+    total_rows = 0
+    excluded_rows = 0
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(
+            run_worker_task, [_metrics is not None] * len(part_paths),
+            [scan_parquet_part] * len(part_paths), part_paths, [columns] * len(part_paths),
+            [chunk_size] * len(part_paths), [exclude_info] * len(part_paths),
+            [where] * len(part_paths),
+        )
+        results = map(unwrap_worker_result, results)
+    else:
+        executor = None
+        results = (scan_parquet_part(path, columns, chunk_size, exclude_info, where)
+                   for path in part_paths)
+    try:
+        for part_flows, part_rows, part_excluded in results:
+            flow_counts.merge(part_flows)
+            total_rows += part_rows
+            excluded_rows += part_excluded
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return flow_counts, total_rows, excluded_rows
+
+
+def get_file_fingerprint(csv_path):
+    """
+    Return a fingerprint of a file: its size and modification time plus a
+    hash of evenly spaced sample blocks, including the first and last block.
+    
+    Cheap enough to compute on multi-GB exports. The sample blocks only cover
+    a small part of a large file, so an in-place edit of the same length is
+    caught by the modification time, not by the hash.
+    """
+    stat = os.stat(csv_path)
+    file_size = stat.st_size
+    digest = hashlib.blake2b(f"{file_size}\0{stat.st_mtime_ns}".encode('ascii'), digest_size=16)
+    with open(csv_path, 'rb') as f:
+        for i in range(FINGERPRINT_SAMPLES):
+            f.seek(max(0, file_size - FINGERPRINT_BLOCK_SIZE) * i // (FINGERPRINT_SAMPLES - 1))
+            digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def get_result_cache_path(csv_path, cache_dir, exclude_info=False, where=None):
+    """
+    Return the result cache file for a CSV file, keyed on its fingerprint
+    (see get_file_fingerprint) and on every option that changes the
+    aggregated results.
+    """
+    key = json.dumps({
+        'fingerprint': get_file_fingerprint(csv_path),
+        'exclude_info': exclude_info,
+        'where': where,
+    }, sort_keys=True)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return Path(cache_dir) / f"{Path(csv_path).name}-{digest}.flows.json"
+
+
+def read_json_state(path, version):
+    """Read a JSON state file, returning None if it is missing, unreadable or of another version."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get('version') != version:
+        return None
+    return state
+
+
+def write_json_state(path, state):
+    """Atomically write a JSON state file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+
+def flow_counts_to_list(flow_counts):
+    """Flatten flow counts to JSON-friendly [sensor_type, severity, status, count] rows."""
+    return [list(flow_key) + [count] for flow_key, count in flow_counts.items()]
+
+
+def flow_counts_from_list(flows):
+    """Rebuild flow counts from the rows written by flow_counts_to_list."""
+    flow_counts = FlowCube()
+    if flows:
+        sensor_types, severities, statuses, counts = zip(*flows)
+        flow_counts.add_labels([sensor_types, severities, statuses], counts)
+    return flow_counts
+
+
+def load_result_cache(result_path):
+    """
+    Load aggregated results saved by save_result_cache.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows), or None if there is
+        no usable cache file
+    """
+    cached = read_json_state(result_path, RESULT_CACHE_VERSION)
+    if cached is None:
+        return None
+    return flow_counts_from_list(cached['flows']), cached['total_rows'], cached['excluded_rows']
+
+
+def save_result_cache(result_path, flow_counts, total_rows, excluded_rows):
+    """Atomically write aggregated results to a small JSON sidecar file."""
+    write_json_state(result_path, {
+        'version': RESULT_CACHE_VERSION,
+        'total_rows': total_rows,
+        'excluded_rows': excluded_rows,
+        'flows': flow_counts_to_list(flow_counts),
+    })
+
+
+def write_partial(partial_path, flow_counts, total_rows, excluded_rows, exclude_info=False,
+                  sources=(), where=None):
+    """
+    Atomically write aggregated results to a partial aggregate file.
+    
+    Layout (little-endian): PARTIAL_MAGIC, uint16 version, uint32 header
+    length, a UTF-8 JSON header with the row totals, options, source files
+    and the node labels of every dimension, uint64 number of non-zero cells,
+    then one int32 label id per dimension per cell followed by one int64
+    count per cell.
+    """
+    header = json.dumps({
+        'dimensions': list(FLOW_DIMENSIONS),
+        'labels': flow_counts.labels,
+        'total_rows': total_rows,
+        'excluded_rows': excluded_rows,
+        'exclude_info': exclude_info,
+        'where': where,
+        'sources': [str(source) for source in sources],
+    }).encode('utf-8')
+    cells = np.nonzero(flow_counts.counts)
+    ids = np.stack(cells, axis=1).astype('<i4') if cells[0].size else np.zeros((0, len(cells)), '<i4')
+    counts = flow_counts.counts[cells].astype('<i8')
+    
+    path = Path(partial_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(temp_path, 'wb') as f:
+        f.write(PARTIAL_MAGIC)
+        f.write(struct.pack('<HI', PARTIAL_VERSION, len(header)))
+        f.write(header)
+        f.write(struct.pack('<Q', len(counts)))
+        f.write(ids.tobytes())
+        f.write(counts.tobytes())
+    os.replace(temp_path, path)
+
+
+def read_partial(partial_path):
+    """
+    Read a partial aggregate file written by write_partial.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows, header dict)
+    
+    Raises:
+        ValueError: If the file is not a partial aggregate of a supported version
+    """
+    with open(partial_path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(PARTIAL_MAGIC):
+        raise ValueError(f"{partial_path} is not a partial aggregate file")
+    offset = len(PARTIAL_MAGIC)
+    version, header_size = struct.unpack_from('<HI', data, offset)
+    if version != PARTIAL_VERSION:
+        raise ValueError(f"{partial_path} has partial format version {version}, "
+                         f"this script reads version {PARTIAL_VERSION}")
+    offset += struct.calcsize('<HI')
+    header = json.loads(data[offset:offset + header_size].decode('utf-8'))
+    offset += header_size
+    if header['dimensions'] != list(FLOW_DIMENSIONS):
+        raise ValueError(f"{partial_path} aggregates {header['dimensions']}, expected {list(FLOW_DIMENSIONS)}")
+    (num_cells,) = struct.unpack_from('<Q', data, offset)
+    offset += 8
+    num_dimensions = len(FLOW_DIMENSIONS)
+    ids = np.frombuffer(data, dtype='<i4', count=num_cells * num_dimensions, offset=offset)
+    offset += ids.nbytes
+    counts = np.frombuffer(data, dtype='<i8', count=num_cells, offset=offset)
+    
+    flow_counts = FlowCube(num_dimensions)
+    id_maps = [flow_counts.intern(axis, labels) for axis, labels in enumerate(header['labels'])]
+    ids = ids.reshape(num_cells, num_dimensions).astype(np.int64)
+    flow_counts.add_ids([id_map[ids[:, axis]] for axis, id_map in enumerate(id_maps)], counts)
+    return flow_counts, header['total_rows'], header['excluded_rows'], header
+
+
+def merge_partials(partial_paths):
+    """
+    Merge partial aggregate files. Merging is associative, so partials may
+    themselves be the output of earlier merges.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows, exclude_info, where, sources)
+    """
+    flow_counts = FlowCube()
+    total_rows = 0
+    excluded_rows = 0
+    exclude_info = None
+    where = None
+    sources = []
+    for partial_num, partial_path in enumerate(partial_paths):
+        partial_counts, partial_rows, partial_excluded, header = read_partial(partial_path)
+        # Partials written before --where existed have no 'where' entry
+        if partial_num == 0:
+            exclude_info = header['exclude_info']
+            where = header.get('where')
+        elif header['exclude_info'] != exclude_info:
+            raise ValueError(f"{partial_path} was written with exclude_info={header['exclude_info']}, "
+                             f"the other partials with exclude_info={exclude_info}")
+        elif header.get('where') != where:
+            raise ValueError(f"{partial_path} was written with --where {header.get('where')!r}, "
+                             f"the other partials with --where {where!r}")
+        flow_counts.merge(partial_counts)
+        total_rows += partial_rows
+        excluded_rows += partial_excluded
+        sources.extend(header['sources'])
+        print(f"Merged {partial_path} ({partial_rows:,} rows)")
+    return flow_counts, total_rows, excluded_rows, bool(exclude_info), where, sources
+
+
+def get_prefix_digest(csv_path, offset):
+    """
+    Hash the start of the file and the bytes just before offset.
+    A checkpoint is only resumed if these are unchanged, i.e. the file was
+    appended to rather than rewritten.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(csv_path, 'rb') as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BLOCK_SIZE)))
+        f.seek(max(0, offset - FINGERPRINT_BLOCK_SIZE))
+        digest.update(f.read(offset - f.tell()))
+    return digest.hexdigest()
+
+
+def load_checkpoint(checkpoint_path, csv_path, column_names, exclude_info=False, where=None):
+    """
+    Load an incremental checkpoint if it can be resumed for this file.
+    
+    The checkpoint must have been written with the same header and filter
+    options, and the file must still start with the bytes it covered.
+    
+    Returns:
+        Checkpoint dict, or None to start from the beginning of the file
+    """
+    checkpoint = read_json_state(checkpoint_path, CHECKPOINT_VERSION)
+    if checkpoint is None:
+        return None
+    if checkpoint['column_names'] != column_names or checkpoint['exclude_info'] != exclude_info \
+            or checkpoint.get('where') != where:
+        print("Checkpoint was written for a different header or filter options, rescanning from the start")
+        return None
+    if os.path.getsize(csv_path) < checkpoint['offset'] or \
+            get_prefix_digest(csv_path, checkpoint['offset']) != checkpoint['prefix_digest']:
+        print("File no longer matches the checkpoint (rewritten or truncated), rescanning from the start")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, csv_path, offset, column_names, exclude_info,
+                    flow_counts, total_rows, excluded_rows, where=None):
+    """Save the byte offset scanned so far together with the aggregates up to it."""
+    write_json_state(checkpoint_path, {
+        'version': CHECKPOINT_VERSION,
+        'file': str(Path(csv_path).resolve()),
+        'offset': offset,
+        'prefix_digest': get_prefix_digest(csv_path, offset),
+        'column_names': column_names,
+        'exclude_info': exclude_info,
+        'where': where,
+        'total_rows': total_rows,
+        'excluded_rows': excluded_rows,
+        'flows': flow_counts_to_list(flow_counts),
+    })
+
+
+def scan_incremental(csv_path, columns, column_names, checkpoint_path, chunk_size=100000,
+                     exclude_info=False, engine='pandas', workers=1, use_mmap=False,
+                     max_memory=None, where=None):
+    """
+    Fold only the records appended since the last checkpoint into its saved
+    aggregates, then move the checkpoint to the new end of the file.
+    
+    A final record without a trailing newline is counted if it parses to the
+    header's number of fields; otherwise it is taken to be still being written
+    and left for the next run.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
     """
-    if pd.isna(sensor_types_str) or sensor_types_str == '':
-        return []
+    checkpoint = load_checkpoint(checkpoint_path, csv_path, column_names, exclude_info, where)
+    if checkpoint is not None:
+        flow_counts = flow_counts_from_list(checkpoint['flows'])
+        total_rows = checkpoint['total_rows']
+        excluded_rows = checkpoint['excluded_rows']
+        start = checkpoint['offset']
+        print(f"Resuming from checkpoint at byte {start:,} ({total_rows:,} rows already counted)")
+    else:
+        flow_counts = FlowCube()
+        total_rows = 0
+        excluded_rows = 0
+        start = find_record_start(csv_path, 0)
     
-    # Remove surrounding quotes if present
-    sensor_types_str = str(sensor_types_str).strip()
-    if sensor_types_str.startswith('"') and sensor_types_str.endswith('"'):
-        sensor_types_str = sensor_types_str[1:-1]
+    file_size = os.path.getsize(csv_path)
+    end = find_last_record_end(csv_path, start, file_size)
+    if end < file_size:
+        # Complete exports often lack a trailing newline; a record still being written does not parse
+        if is_complete_record(csv_path, end, file_size, len(column_names)):
+            end = file_size
+        else:
+            print(f"Note: leaving {file_size - end:,} trailing bytes of an incomplete record "
+                  f"for the next run")
+    if end > start:
+        print(f"Scanning {end - start:,} bytes from offset {start:,}")
+        new_flows, new_rows, new_excluded = scan_csv(
+            csv_path, columns, column_names, chunk_size, exclude_info, engine, workers,
+            use_mmap, data_start=start, data_end=end, max_memory=max_memory, where=where
+        )
+        flow_counts.merge(new_flows)
+        total_rows += new_rows
+        excluded_rows += new_excluded
+    else:
+        print("No new records since the checkpoint")
+    
+    save_checkpoint(checkpoint_path, csv_path, end, column_names, exclude_info,
+                    flow_counts, total_rows, excluded_rows, where)
+    print(f"\nSaved checkpoint: {checkpoint_path}")
+    return flow_counts, total_rows, excluded_rows
+
+
+def detect_compression(csv_path):
+    """Return 'gzip', 'bz2', 'zstd' or 'zip' from the file's leading bytes, or None for plain CSV."""
+    with open(csv_path, 'rb') as f:
+        return match_compression_magic(f.read(4))
+
+
+def match_compression_magic(head):
+    """Return the compression whose magic bytes start head, or None."""
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def find_zstd_frames(f, file_size):
+    """
+    Locate the frames of a zstd file by walking frame and block headers.
+    Skippable frames are left out.
+    
+    Returns:
+        List of (offset, length) tuples, or None if the file is not valid zstd
+    """
+    frames = []
+    offset = 0
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(5)
+        if len(header) < 5:
+            return None
+        magic = int.from_bytes(header[:4], 'little')
+        if 0x184D2A50 <= magic <= 0x184D2A5F:
+            f.seek(offset + 4)
+            offset += 8 + int.from_bytes(f.read(4), 'little')
+            continue
+        if magic != 0xFD2FB528:
+            return None
+        descriptor = header[4]
+        single_segment = descriptor >> 5 & 1
+        position = offset + 5 + (1 - single_segment) + (0, 1, 2, 4)[descriptor & 3] \
+            + (single_segment, 2, 4, 8)[descriptor >> 6]
+        while True:
+            f.seek(position)
+            block_header = f.read(3)
+            if len(block_header) < 3:
+                return None
+            block = int.from_bytes(block_header, 'little')
+            block_type = block >> 1 & 3
+            if block_type == 3:
+                return None
+            position += 3 + (1 if block_type == 1 else block >> 3)
+            if block & 1:
+                break
+        if descriptor >> 2 & 1:
+            position += 4
+        frames.append((offset, position - offset))
+        offset = position
+    return frames
+
+
+def find_bgzf_blocks(f, file_size):
+    """
+    Locate the members of a BGZF (blocked gzip, as written by bgzip) file from
+    the block size stored in each member header.
+    
+    Returns:
+        List of (offset, length) tuples, or None if the file is not BGZF
+    """
+    blocks = []
+    offset = 0
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(18)
+        if len(header) < 18 or header[:4] != b'\x1f\x8b\x08\x04' or header[12:16] != b'BC\x02\x00':
+            return None
+        size = int.from_bytes(header[16:18], 'little') + 1
+        blocks.append((offset, size))
+        offset += size
+    return blocks
+
+
+def find_compressed_frames(csv_path, compression):
+    """
+    Locate the independently decompressible frames of a multi-frame zstd or
+    BGZF gzip file without decompressing it.
+    
+    Returns:
+        List of (offset, length) tuples, or None if the file cannot be split
+    """
+    file_size = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as f:
+        if compression == 'zstd':
+            return find_zstd_frames(f, file_size)
+        if compression == 'gzip':
+            return find_bgzf_blocks(f, file_size)
+    return None
+
+
+def decompress_frames(data, compression):
+    """Decompress one or more complete gzip members or zstd frames."""
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(data), read_across_frames=True
+        ).read()
+    return pa.input_stream(pa.BufferReader(data), compression='zstd').read()
+
+
+class ParallelDecompressReader(io.RawIOBase):
+    """
+    Raw binary reader over a multi-frame compressed file that decompresses
+    groups of frames in a thread pool ahead of the consumer.
+    
+    zlib and zstd release the GIL while decompressing, so the groups inflate
+    concurrently while the CSV parser consumes the results in file order.
+    """
+    
+    def __init__(self, path, frames, compression, workers):
+        super().__init__()
+        self._file = open(path, 'rb')
+        self._compression = compression
+        self._groups = deque()
+        group = []
+        group_size = 0
+        for offset, length in frames:
+            group.append((offset, length))
+            group_size += length
+            if group_size >= DECOMPRESS_GROUP_SIZE:
+                self._groups.append(group)
+                group = []
+                group_size = 0
+        if group:
+            self._groups.append(group)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = deque()
+        self._max_pending = workers * 2
+        self._buffer = b''
+        self._position = 0
+        self._submit()
+    
+    def _submit(self):
+        while self._groups and len(self._pending) < self._max_pending:
+            data = bytearray()
+            for offset, length in self._groups.popleft():
+                self._file.seek(offset)
+                data += self._file.read(length)
+            self._pending.append(
+                self._executor.submit(decompress_frames, bytes(data), self._compression)
+            )
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        while self._position >= len(self._buffer):
+            if not self._pending:
+                return 0
+            self._buffer = self._pending.popleft().result()
+            self._position = 0
+            self._submit()
+        size = min(len(buffer), len(self._buffer) - self._position)
+        memoryview(buffer)[:size] = self._buffer[self._position:self._position + size]
+        self._position += size
+        return size
+    
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._file.close()
+        super().close()
+
+
+def open_decompressed(csv_path, compression, workers=1):
+    """
+    Open a gzip, bz2 or zstd file as a stream of decompressed CSV bytes.
+    
+    With workers > 1, multi-frame zstd and BGZF gzip files are decompressed in
+    parallel; other files are decompressed on the fly by a single stream.
+    """
+    if workers > 1:
+        frames = find_compressed_frames(csv_path, compression)
+        if frames is not None and len(frames) > 1:
+            print(f"Decompressing {len(frames):,} {compression} frames with {workers} threads")
+            return io.BufferedReader(
+                ParallelDecompressReader(csv_path, frames, compression, workers), SCAN_BLOCK_SIZE
+            )
+    if compression == 'gzip':
+        return gzip.open(csv_path, 'rb')
+    if compression == 'bz2':
+        return bz2.open(csv_path, 'rb')
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(csv_path, 'rb'), read_across_frames=True, closefd=True
+        )
+    if pa is not None:
+        return pa.input_stream(str(csv_path), compression='zstd')
+    raise RuntimeError("zstd input requires the zstandard or pyarrow package "
+                       "(pip install zstandard)")
+
+
+def get_zip_members(csv_path):
+    """Return the CSV members of a zip archive, or every file member if none end in .csv."""
+    with zipfile.ZipFile(csv_path) as archive:
+        members = [info.filename for info in archive.infolist() if not info.is_dir()]
+    csv_members = [member for member in members if member.lower().endswith('.csv')]
+    return csv_members or members
+
+
+def check_compressed_header(csv_path, compression, columns):
+    """
+    Verify the header of a compressed export, or of every CSV member of a zip
+    archive, with check_csv_header.
+    
+    Returns:
+        List of all column names in the (first) header
+    """
+    if compression == 'zip':
+        column_names = None
+        with zipfile.ZipFile(csv_path) as archive:
+            for member in get_zip_members(csv_path):
+                with archive.open(member) as source:
+                    member_columns = check_csv_header(source, columns)
+                column_names = column_names or member_columns
+        return column_names
+    with open_decompressed(csv_path, compression) as source:
+        return check_csv_header(source, columns)
+
+
+def scan_zip_member(csv_path, member, columns, chunk_size=100000, exclude_info=False,
+                    engine='pandas', parquet_path=None, max_memory=None, where=None):
+    """
+    Aggregate one CSV member of a zip archive, streaming it out of the archive.
+    Runs in a worker process when members are scanned in parallel.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    flow_counts = FlowCube()
+    with zipfile.ZipFile(csv_path) as archive, archive.open(member) as source:
+        chunk_iter, aggregate = open_chunk_reader(
+            source, columns, chunk_size, engine, max_memory=max_memory, where=where
+        )
+        if parquet_path is not None:
+            chunk_iter = write_parquet_part(chunk_iter, parquet_path, columns)
+        total_rows, excluded_rows = scan_chunks(
+            chunk_iter, aggregate, flow_counts, exclude_info=exclude_info, show_progress=False,
+            where=where
+        )
+    return flow_counts, total_rows, excluded_rows
+
+
+def scan_compressed(csv_path, compression, columns, chunk_size=100000, exclude_info=False,
+                    engine='pandas', workers=1, parquet_dir=None, max_memory=None, where=None):
+    """
+    Scan a compressed export by streaming decompression straight into the
+    chunked reader. The members of a zip archive are scanned one per task
+    when workers > 1.
+    
+    Args:
+        parquet_dir: If given, the chunks are also written to Parquet part
+            files in this directory
     
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    flow_counts = FlowCube()
+    if compression != 'zip':
+        with open_decompressed(csv_path, compression, workers) as source:
+            chunk_iter, aggregate = open_chunk_reader(
+                source, columns, chunk_size, engine, max_memory=max_memory, where=where
+            )
+            if parquet_dir is not None:
+                chunk_iter = write_parquet_part(
+                    chunk_iter, get_parquet_part_path(parquet_dir, 0), columns
+                )
+            total_rows, excluded_rows = scan_chunks(
+                chunk_iter, aggregate, flow_counts, exclude_info=exclude_info, where=where
+            )
+        return flow_counts, total_rows, excluded_rows
+    
+    members = get_zip_members(csv_path)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(members) > 1 else None
+    if executor is not None and max_memory:
+        max_memory //= workers
+    tasks = [
+        (csv_path, member, columns, chunk_size, exclude_info, engine,
+         get_parquet_part_path(parquet_dir, member_num) if parquet_dir else None, max_memory, where)
+        for member_num, member in enumerate(members)
+    ]
+    total_rows = 0
+    excluded_rows = 0
     try:
-        # Try JSON parsing first
-        parsed = json.loads(sensor_types_str)
-        if isinstance(parsed, list):
-            return [str(s).strip('"') for s in parsed]
-        return [str(parsed).strip('"')]
-    except (json.JSONDecodeError, ValueError):
+        if executor is not None:
+            results = [executor.submit(run_worker_task, _metrics is not None, scan_zip_member, *task)
+                       for task in tasks]
+            results = (unwrap_worker_result(future.result()) for future in results)
+        else:
+            results = (scan_zip_member(*task) for task in tasks)
+        for member, (member_flows, member_rows, member_excluded) in zip(members, results):
+            flow_counts.merge(member_flows)
+            total_rows += member_rows
+            excluded_rows += member_excluded
+            print(f"Processed archive member {member} ({member_rows:,} rows)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return flow_counts, total_rows, excluded_rows
+
+
+def open_stdin():
+    """
+    Return standard input as a binary stream, decompressing gzip, bz2 or zstd
+    input on the fly. Nothing is buffered beyond the reader's own chunks.
+    """
+    stream = sys.stdin.buffer
+    compression = match_compression_magic(stream.peek(4)[:4])
+    if compression is None:
+        return stream
+    if compression == 'zip':
+        raise RuntimeError("zip archives cannot be read from stdin, pipe the CSV member instead "
+                           "(e.g. unzip -p export.zip | analyze_taegis_detections.py -)")
+    print(f"Streaming {compression} decompression into the reader")
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(stream, mode='rb')
+    if compression == 'zstd' and zstandard is not None:
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+        )
+    if compression == 'zstd' and pa is not None:
+        return io.BufferedReader(
+            pa.CompressedInputStream(pa.PythonFile(stream, mode='r'), 'zstd')
+        )
+    raise RuntimeError("zstd input requires the zstandard or pyarrow package "
+                       "(pip install zstandard)")
+
+
+def read_stream_header(stream, columns):
+    """
+    Read the header record from a binary stream and verify the required columns,
+    leaving the stream positioned at the first data record.
+    
+    Returns:
+        List of all column names in the header
+    """
+    header = stream.readline()
+    while header.count(b'"') % 2:
+        line = stream.readline()
+        if not line:
+            break
+        header += line
+    available = next(csv.reader(io.StringIO(header.decode('utf-8-sig'))), [])
+    verify_columns(available, columns)
+    return available
+
+
+def scan_stdin(columns, chunk_size=100000, exclude_info=False, engine='pandas', max_memory=None,
+               where=None):
+    """
+    Scan a CSV piped into standard input in constant memory.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    flow_counts = FlowCube()
+    source = open_stdin()
+    column_names = read_stream_header(source, columns)
+    chunk_iter, aggregate = open_chunk_reader(
+        source, columns, chunk_size, engine, column_names, max_memory=max_memory, where=where
+    )
+    total_rows, excluded_rows = scan_chunks(
+        chunk_iter, aggregate, flow_counts, exclude_info=exclude_info, where=where
+    )
+    return flow_counts, total_rows, excluded_rows
+
+
+def scan_csv(csv_path, columns, column_names, chunk_size=100000, exclude_info=False,
+             engine='pandas', workers=1, use_mmap=False, cache_dir=None,
+             data_start=None, data_end=None, compression=None, max_memory=None, where=None):
+    """
+    Scan the CSV with the selected engine, reading or building the Parquet
+    conversion cache when cache_dir is given.
+    
+    Args:
+        data_start, data_end: Record boundaries limiting the scan to part of
+            the file; the Parquet cache is not used for partial scans
+        compression: Compression detected by detect_compression, if any
+        max_memory: Memory budget in bytes for sizing chunks, see open_chunk_reader
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    if data_start is not None:
+        if workers > 1:
+            return scan_parallel(
+                csv_path, column_names, columns, chunk_size, exclude_info, engine, workers,
+                use_mmap, data_start=data_start, data_end=data_end, max_memory=max_memory,
+                where=where
+            )
+        return scan_byte_range(
+            csv_path, data_start, data_end, column_names, columns, chunk_size, exclude_info,
+            engine, use_mmap, show_progress=True, max_memory=max_memory, where=where
+        )
+    
+    flow_counts = FlowCube()
+    cache_path = None
+    parquet_dir = None
+    if cache_dir:
+        cache_path = get_parquet_cache_path(csv_path, columns, cache_dir)
+        if not cache_path.is_dir():
+            # Convert into a private directory and publish it only once complete
+            parquet_dir = cache_path.with_name(f"{cache_path.name}.tmp-{os.getpid()}")
+            parquet_dir.mkdir(parents=True, exist_ok=True)
+    
+    if cache_path is not None and parquet_dir is None:
+        print(f"Reading Parquet cache: {cache_path}")
+        flow_counts, total_rows, excluded_rows = scan_parquet_cache(
+            cache_path, columns, chunk_size, exclude_info, workers, where
+        )
+    else:
         try:
-            # Try ast.literal_eval as fallback
-            parsed = ast.literal_eval(sensor_types_str)
-            if isinstance(parsed, list):
-                return [str(s).strip('"') for s in parsed]
-            return [str(parsed).strip('"')]
-        except (ValueError, SyntaxError):
-            # If all else fails, try to extract from string directly
-            if sensor_types_str.startswith('[') and sensor_types_str.endswith(']'):
-                # Remove brackets and split
-                content = sensor_types_str[1:-1]
-                items = [s.strip().strip('"').strip("'") for s in content.split(',')]
-                return [s for s in items if s]
-            return [sensor_types_str]
+            if compression:
+                flow_counts, total_rows, excluded_rows = scan_compressed(
+                    csv_path, compression, columns, chunk_size, exclude_info, engine, workers,
+                    parquet_dir, max_memory, where
+                )
+            elif workers > 1:
+                flow_counts, total_rows, excluded_rows = scan_parallel(
+                    csv_path, column_names, columns, chunk_size, exclude_info, engine, workers,
+                    use_mmap, parquet_dir, max_memory=max_memory, where=where
+                )
+            else:
+                chunk_iter, aggregate = open_chunk_reader(
+                    csv_path, columns, chunk_size, engine, use_mmap=use_mmap, max_memory=max_memory,
+                    where=where
+                )
+                if parquet_dir is not None:
+                    chunk_iter = write_parquet_part(
+                        chunk_iter, get_parquet_part_path(parquet_dir, 0), columns
+                    )
+                total_rows, excluded_rows = scan_chunks(
+                    chunk_iter, aggregate, flow_counts, exclude_info=exclude_info, where=where
+                )
+        except BaseException:
+            # A failed or interrupted conversion must not leave a partial copy behind
+            if parquet_dir is not None:
+                shutil.rmtree(parquet_dir, ignore_errors=True)
+            raise
+    
+    if parquet_dir is not None:
+        try:
+            parquet_dir.rename(cache_path)
+            print(f"\nSaved Parquet cache: {cache_path}")
+        except OSError:
+            # Another run published the same cache first
+            shutil.rmtree(parquet_dir, ignore_errors=True)
+    return flow_counts, total_rows, excluded_rows
 
 
-def clean_string_field(value):
-    """Remove surrounding quotes from string fields."""
-    if pd.isna(value):
-        return None
-    value = str(value).strip()
-    if value.startswith('"') and value.endswith('"'):
-        value = value[1:-1]
-    return value if value else None
+def scan_file(csv_path, chunk_size=100000, exclude_info=False, engine='pandas', workers=1,
+              use_mmap=False, cache_dir=None, parquet_cache_dir=None, checkpoint_path=None,
+              max_memory=None, where=None, time_range=None):
+    """
+    Aggregate the flows of one CSV file, using the result cache, a checkpoint
+    or streaming decompression as configured.
+    
+    Args:
+        time_range: Optional (time_column, since, until) of a --since/--until
+            window that where already filters on. If the file is sorted by
+            time only the byte range holding the window is scanned
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows, loaded_from_cache)
+    """
+    compression = detect_compression(csv_path)
+    if compression:
+        print(f"Streaming {compression} decompression into the reader")
+        if checkpoint_path:
+            print("Error: --checkpoint requires an uncompressed CSV file")
+            sys.exit(1)
+        if use_mmap:
+            print("Note: --mmap is ignored for compressed input")
+            use_mmap = False
+    
+    if cache_dir:
+        result_path = get_result_cache_path(csv_path, cache_dir, exclude_info, where)
+        cached = load_result_cache(result_path)
+        if cached is not None:
+            print(f"Loaded cached results: {result_path}")
+            return cached + (True,)
+    
+    # Only materialize the columns the analysis needs; exports carry many
+    # wide free-text columns that would otherwise be parsed for nothing
+    columns = get_required_columns(where=where)
+    if compression:
+        column_names = check_compressed_header(csv_path, compression, columns)
+    else:
+        column_names = check_csv_header(csv_path, columns)
+    if checkpoint_path:
+        flow_counts, total_rows, excluded_rows = scan_incremental(
+            csv_path, columns, column_names, checkpoint_path, chunk_size, exclude_info,
+            engine, workers, use_mmap, max_memory, where
+        )
+    else:
+        data_range = None
+        if time_range is not None:
+            if compression:
+                print("Note: --since/--until read all of a compressed file, as it cannot be searched")
+            else:
+                data_range = find_time_range(csv_path, column_names, *time_range)
+                if data_range is None:
+                    print(f"Note: {csv_path} is not sorted by {time_range[0]}, scanning all of it")
+        if data_range is not None:
+            data_start, data_end = data_range
+            file_size = os.path.getsize(csv_path)
+            print(f"Time window is in bytes {data_start:,}-{data_end:,} "
+                  f"({100 * (data_end - data_start) / max(file_size, 1):.1f}% of the file)")
+            if data_end > data_start:
+                flow_counts, total_rows, excluded_rows = scan_csv(
+                    csv_path, columns, column_names, chunk_size, exclude_info, engine, workers,
+                    use_mmap, data_start=data_start, data_end=data_end, max_memory=max_memory,
+                    where=where
+                )
+            else:
+                flow_counts, total_rows, excluded_rows = FlowCube(), 0, 0
+        else:
+            flow_counts, total_rows, excluded_rows = scan_csv(
+                csv_path, columns, column_names, chunk_size, exclude_info, engine, workers,
+                use_mmap, parquet_cache_dir, compression=compression, max_memory=max_memory,
+                where=where
+            )
+    if cache_dir:
+        save_result_cache(result_path, flow_counts, total_rows, excluded_rows)
+    return flow_counts, total_rows, excluded_rows, False
+
+
+def scan_files(csv_paths, chunk_size=100000, exclude_info=False, engine='pandas', workers=1,
+               use_mmap=False, cache_dir=None, parquet_cache_dir=None, max_memory=None, where=None,
+               time_range=None):
+    """
+    Aggregate several CSV files into one set of flow counts. With more than one
+    worker the files are scanned concurrently, one file per process.
+    
+    Returns:
+        Tuple of (flow_counts, total_rows, excluded_rows)
+    """
+    flow_counts = FlowCube()
+    total_rows = 0
+    excluded_rows = 0
+    
+    def merge(csv_path, result):
+        nonlocal total_rows, excluded_rows
+        file_counts, file_rows, file_excluded, _ = result
+        flow_counts.merge(file_counts)
+        total_rows += file_rows
+        excluded_rows += file_excluded
+        print(f"Finished {csv_path}: {file_rows:,} rows")
+    
+    if workers <= 1:
+        for csv_path in csv_paths:
+            print(f"\nScanning {csv_path}")
+            merge(csv_path, scan_file(
+                csv_path, chunk_size, exclude_info, engine, 1, use_mmap, cache_dir,
+                parquet_cache_dir, max_memory=max_memory, where=where, time_range=time_range
+            ))
+        return flow_counts, total_rows, excluded_rows
+    
+    processes = min(workers, len(csv_paths))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(run_worker_task, _metrics is not None, scan_file, csv_path, chunk_size,
+                            exclude_info, engine, 1, use_mmap, cache_dir, parquet_cache_dir,
+                            max_memory=max_memory // processes if max_memory else None,
+                            where=where, time_range=time_range)
+            for csv_path in csv_paths
+        ]
+        # Merge in input order so the totals do not depend on scheduling
+        for csv_path, future in zip(csv_paths, futures):
+            merge(csv_path, unwrap_worker_result(future.result()))
+    return flow_counts, total_rows, excluded_rows
 
 
-def process_csv_chunks(csv_path, chunk_size=100000, exclude_info=False):
+def process_csv_chunks(csv_path, chunk_size=100000, exclude_info=False, engine='pandas', workers=1,
+                       use_mmap=False, cache_dir=None, checkpoint_path=None, partial_path=None,
+                       max_memory=None, where=None, time_column=TIME_COLUMN, since=None, until=None,
+                       relative_time=False):
     """
     Process CSV file in chunks and aggregate sensor_type → severity → status flows.
     
     Args:
-        csv_path: Path to CSV file
-        chunk_size: Number of rows to process at a time
+        csv_path: Path to CSV file, '-' to read the CSV from standard input, or
+            a list of paths whose flows are merged into one set of counts
+        chunk_size: Number of rows to process at a time (pandas engine)
         exclude_info: If True, exclude rows with severity="INFO"
+        engine: 'pandas' for chunked pd.read_csv, or 'pyarrow' for Arrow's
+            multithreaded streaming reader (falls back to pandas if pyarrow
+            is not installed)
+        workers: Number of processes; above 1 the file is split into
+            record-aligned byte ranges that are scanned in parallel
+        use_mmap: If True, read the file through a memory map so that
+            workers and boundary scans share the OS page cache
+        cache_dir: Directory for cached results. The aggregated flows are
+            saved keyed on the file's content and the filter options, and
+            reused without scanning when both are unchanged. With pyarrow
+            installed a Parquet conversion of the CSV is cached as well
+        checkpoint_path: Incremental mode for a CSV that is only ever appended
+            to. The aggregates and the byte offset reached are saved here, and
+            the next run only scans the records added after that offset.
+            Caches are not used in this mode
+        partial_path: If given, the aggregated results are also written to
+            this partial aggregate file for the merge subcommand
+        max_memory: Memory budget in bytes. Instead of chunk_size rows, chunks
+            are sized from the measured bytes per row to stay within it
+            (shared evenly between workers)
+        where: Optional --where expression (see compile_where); only the rows
+            it selects are aggregated, and the columns it refers to are read
+            in addition to the flow columns
+        time_column: Timestamp column that since and until apply to
+        since, until: Optional UTC pd.Timestamps; only rows with since <=
+            time_column < until are aggregated. Files sorted by time_column
+            are binary-searched so that only the window's bytes are scanned
+        relative_time: If True, since or until was given relative to now, so
+            the window moves on every run. Its results are not cached, as no
+            later run would look them up
     """
-    flow_counts = defaultdict(int)
-    total_rows = 0
-    excluded_rows = 0
-    sensor_types_set = set()
-    severity_set = set()
-    status_set = set()
+    csv_paths = list(csv_path) if isinstance(csv_path, (list, tuple)) else [csv_path]
+    if engine == 'pyarrow' and pa is None:
+        print("Warning: pyarrow is not installed, falling back to the pandas engine")
+        print("Note: Install pyarrow (pip install pyarrow) for the pyarrow engine")
+        engine = 'pandas'
+    parquet_cache_dir = cache_dir
+    if cache_dir and pa is None:
+        print("Warning: pyarrow is not installed, the Parquet cache is disabled")
+        print("Note: Install pyarrow (pip install pyarrow) to cache a Parquet copy of the CSV")
+        parquet_cache_dir = None
     
-    print(f"Processing CSV file: {csv_path}")
-    print(f"Chunk size: {chunk_size:,} rows")
+    reading_stdin = any(str(path) == STDIN_PATH for path in csv_paths)
+    if reading_stdin and len(csv_paths) > 1:
+        print("Error: '-' (stdin) cannot be combined with other input files")
+        sys.exit(1)
+    if reading_stdin:
+        # Options that need to seek in or identify the input file
+        for option, enabled in (('--workers', workers > 1), ('--mmap', use_mmap),
+                                ('--cache-dir', cache_dir), ('--checkpoint', checkpoint_path)):
+            if enabled:
+                print(f"Note: {option} is ignored when reading from stdin")
+        workers = 1
+        use_mmap = False
+        cache_dir = parquet_cache_dir = checkpoint_path = None
+        print("Processing CSV from stdin")
+    elif len(csv_paths) == 1:
+        print(f"Processing CSV file: {csv_paths[0]}")
+    else:
+        print(f"Processing {len(csv_paths)} CSV files:")
+        for path in csv_paths:
+            print(f"  {path}")
+        if checkpoint_path:
+            print("Error: --checkpoint requires a single input file")
+            sys.exit(1)
+    if engine == 'pyarrow':
+        block_size = get_arrow_block_size(max_memory // workers) if max_memory else ARROW_BLOCK_SIZE
+        print(f"Engine: pyarrow ({block_size // (1024 * 1024)} MB blocks)")
+    elif max_memory:
+        print(f"Chunk size: adaptive, within a {format_memory_size(max_memory)} memory budget")
+    else:
+        print(f"Chunk size: {chunk_size:,} rows")
+    if workers > 1:
+        if len(csv_paths) > 1:
+            print(f"Workers: {workers} (one file per process)")
+        else:
+            print(f"Workers: {workers}")
+    if use_mmap:
+        print("Reading through a memory map")
     if exclude_info:
         print("Excluding INFO severity level from analysis")
+    time_range = None
+    if since is not None or until is not None:
+        # Folded into where so that caches, checkpoints and partials key on the window
+        bounds = [f"{time_column} {operator} '{bound.isoformat()}'"
+                  for operator, bound in (('>=', since), ('<', until)) if bound is not None]
+        where = ' and '.join(([f"({where})"] if where else []) + bounds)
+        time_range = (time_column, get_epoch_micros(since) if since is not None else None,
+                      get_epoch_micros(until) if until is not None else None)
+        if reading_stdin or checkpoint_path:
+            print("Note: --since/--until read all of the input in stdin and checkpoint mode")
+        if relative_time and checkpoint_path:
+            print("Warning: a relative --since/--until moves the window on every run, "
+                  "so --checkpoint starts over instead of resuming")
+        elif relative_time and cache_dir:
+            print("Note: --cache-dir does not cache the results of a relative --since/--until")
+            cache_dir = None
+    if where:
+        print(f"Filtering rows: {where}")
+    
+    if checkpoint_path and cache_dir:
+        print("Note: --cache-dir is ignored in incremental checkpoint mode")
+        cache_dir = parquet_cache_dir = None
     
+    _worker_reports.clear()
+    cache_start = _parse_sensor_types_memo.cache_info()
     try:
-        chunk_iter = pd.read_csv(csv_path, chunksize=chunk_size, low_memory=False)
-        
-        for chunk_num, chunk in enumerate(chunk_iter, 1):
-            print(f"Processing chunk {chunk_num} ({len(chunk):,} rows)...", end='\r')
-            
-            # Extract relevant columns
-            if 'sensor_types' not in chunk.columns:
-                print(f"\nError: 'sensor_types' column not found in CSV")
-                print(f"Available columns: {list(chunk.columns)}")
-                sys.exit(1)
-            
-            for idx, row in chunk.iterrows():
-                total_rows += 1
-                
-                # Parse sensor_types
-                sensor_types = parse_sensor_types(row.get('sensor_types'))
-                severity = clean_string_field(row.get('severity'))
-                status = clean_string_field(row.get('status'))
-                
-                # Skip rows with missing critical fields
-                if not sensor_types or severity is None or status is None:
-                    continue
-                
-                # Skip INFO severity if exclude_info is True
-                if exclude_info and severity.upper() == 'INFO':
-                    excluded_rows += 1
-                    continue
-                
-                # Track unique values
-                sensor_types_set.update(sensor_types)
-                severity_set.add(severity)
-                status_set.add(status)
-                
-                # Count flows for each sensor type
-                for sensor_type in sensor_types:
-                    flow_key = (sensor_type, severity, status)
-                    flow_counts[flow_key] += 1
-            
-            if chunk_num % 10 == 0:
-                print(f"\nProcessed {chunk_num} chunks ({total_rows:,} rows total)")
+        if reading_stdin:
+            flow_counts, total_rows, excluded_rows = scan_stdin(
+                get_required_columns(where=where), chunk_size, exclude_info, engine, max_memory, where
+            )
+            cached = False
+        elif len(csv_paths) == 1:
+            flow_counts, total_rows, excluded_rows, cached = scan_file(
+                csv_paths[0], chunk_size, exclude_info, engine, workers, use_mmap, cache_dir,
+                parquet_cache_dir, checkpoint_path, max_memory, where, time_range
+            )
+        else:
+            flow_counts, total_rows, excluded_rows = scan_files(
+                csv_paths, chunk_size, exclude_info, engine, workers, use_mmap, cache_dir,
+                parquet_cache_dir, max_memory, where, time_range
+            )
+            cached = False
         
         print(f"\nFinished processing {total_rows:,} rows")
         if exclude_info:
             print(f"Excluded {excluded_rows:,} rows with INFO severity")
+        if _metrics is not None:
+            input_bytes = None if reading_stdin else sum(os.path.getsize(path) for path in csv_paths)
+            _metrics.record_totals(total_rows, excluded_rows, input_bytes)
+        if not cached:
+            # Values the vectorized array explode does not handle are parsed
+            # one by one through the cache, in this process and every worker
+            cache_info = _parse_sensor_types_memo.cache_info()
+            hits = cache_info.hits - cache_start.hits
+            misses = cache_info.misses - cache_start.misses
+            for report in _worker_reports:
+                hits += report['parse_cache_hits']
+                misses += report['parse_cache_misses']
+            processes = 1 + len({report['pid'] for report in _worker_reports})
+            print(f"sensor_types fallback parse cache (values not handled by the vectorized "
+                  f"explode, {processes} process{'es' if processes > 1 else ''}): "
+                  f"{hits:,} hits, {misses:,} misses")
+        if partial_path:
+            write_partial(partial_path, flow_counts, total_rows, excluded_rows, exclude_info,
+                          sources=csv_paths, where=where)
+            print(f"Saved partial aggregate: {partial_path}")
         
-    except FileNotFoundError:
-        print(f"Error: File not found: {csv_path}")
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename}")
         sys.exit(1)
     except Exception as e:
         print(f"Error processing CSV: {e}")
         sys.exit(1)
     
+    # Track unique values
+    sensor_types_set = set(flow_counts.marginal(0))
+    severity_set = set(flow_counts.marginal(1))
+    status_set = set(flow_counts.marginal(2))
+    
     return flow_counts, sensor_types_set, severity_set, status_set, total_rows
 
 
-def create_sankey_diagram(flow_counts, sensor_types_set, severity_set, status_set, output_path='sankey_diagram.png'):
+def compute_rollups(flow_counts):
+    """
+    Roll the flow counts up to every marginal and pairwise total in one pass.
+    
+    Args:
+        flow_counts: FlowCube, or a dictionary of (sensor_type, severity, status) -> count
+    
+    Returns:
+        Dictionary with 'sensor_type', 'severity' and 'status' totals keyed by
+        label, and 'sensor_type_severity' and 'severity_status' totals keyed by
+        label pairs
+    """
+    if not isinstance(flow_counts, FlowCube):
+        flow_counts = FlowCube().merge(flow_counts)
+    return {
+        'sensor_type': flow_counts.marginal(0),
+        'severity': flow_counts.marginal(1),
+        'status': flow_counts.marginal(2),
+        'sensor_type_severity': flow_counts.rollup((0, 1)),
+        'severity_status': flow_counts.rollup((1, 2)),
+    }
+
+
+def create_sankey_diagram(flow_counts, sensor_types_set, severity_set, status_set, output_path='sankey_diagram.png',
+                          rollups=None):
     """
     Create a Sankey diagram showing sensor_types → severity → status flows.
+    
+    Args:
+        rollups: Result of compute_rollups(flow_counts), computed here if not
+            given so that callers printing a summary can share one pass
     """
+    if rollups is None:
+        rollups = compute_rollups(flow_counts)
+    
     # Sort sets for consistent ordering
     sensor_types = sorted(sensor_types_set)
     severities = sorted(severity_set)
@@ -162,21 +3396,13 @@ def create_sankey_diagram(flow_counts, sensor_types_set, severity_set, status_se
     values = []
     
     # First layer: sensor_types → severity
-    sensor_severity_counts = defaultdict(int)
-    for (sensor_type, severity, status), count in flow_counts.items():
-        sensor_severity_counts[(sensor_type, severity)] += count
-    
-    for (sensor_type, severity), count in sensor_severity_counts.items():
+    for (sensor_type, severity), count in rollups['sensor_type_severity'].items():
         sources.append(node_indices[sensor_type])
         targets.append(node_indices[severity])
         values.append(count)
     
     # Second layer: severity → status
-    severity_status_counts = defaultdict(int)
-    for (sensor_type, severity, status), count in flow_counts.items():
-        severity_status_counts[(severity, status)] += count
-    
-    for (severity, status), count in severity_status_counts.items():
+    for (severity, status), count in rollups['severity_status'].items():
         sources.append(node_indices[severity])
         targets.append(node_indices[status])
         values.append(count)
@@ -219,8 +3445,12 @@ def create_sankey_diagram(flow_counts, sensor_types_set, severity_set, status_se
         print("Note: Install kaleido (pip install kaleido) for PNG export")
 
 
-def print_summary_statistics(flow_counts, sensor_types_set, severity_set, status_set, total_rows):
-    """Print summary statistics."""
+def print_summary_statistics(flow_counts, sensor_types_set, severity_set, status_set, total_rows,
+                             rollups=None):
+    """Print summary statistics from the rollups of compute_rollups (computed if not given)."""
+    if rollups is None:
+        rollups = compute_rollups(flow_counts)
+    
     print("\n" + "="*80)
     print("ANALYSIS SUMMARY")
     print("="*80)
@@ -230,43 +3460,67 @@ def print_summary_statistics(flow_counts, sensor_types_set, severity_set, status
     print(f"Unique status values: {len(status_set)}")
     
     print("\nSensor Types:")
+    sensor_type_dist = rollups['sensor_type']
     for st in sorted(sensor_types_set):
-        count = sum(v for (s, sev, stat), v in flow_counts.items() if s == st)
-        print(f"  - {st}: {count:,} alerts")
+        print(f"  - {st}: {sensor_type_dist.get(st, 0):,} alerts")
     
     print("\nSeverity Distribution:")
-    severity_dist = defaultdict(int)
-    for (sensor_type, severity, status), count in flow_counts.items():
-        severity_dist[severity] += count
+    severity_dist = rollups['severity']
     for sev in sorted(severity_dist.keys()):
         print(f"  - {sev}: {severity_dist[sev]:,} alerts")
     
     print("\nStatus Distribution:")
-    status_dist = defaultdict(int)
-    for (sensor_type, severity, status), count in flow_counts.items():
-        status_dist[status] += count
+    status_dist = rollups['status']
     for stat in sorted(status_dist.keys()):
         print(f"  - {stat}: {status_dist[stat]:,} alerts")
     
     print("\nTop 10 Sensor Type → Severity → Status Flows:")
-    sorted_flows = sorted(flow_counts.items(), key=lambda x: x[1], reverse=True)
+    sorted_flows = sorted(flow_counts.items(), key=lambda x: (-x[1], x[0]))
     for (sensor_type, severity, status), count in sorted_flows[:10]:
         print(f"  {sensor_type} → {severity} → {status}: {count:,} alerts")
     
     print("="*80)
 
 
+def expand_input_paths(patterns):
+    """
+    Expand the csv_file arguments into a list of existing paths. Glob patterns
+    are expanded here so they also work when quoted or on shells that do not
+    expand them; files named more than once are scanned once.
+    """
+    csv_paths = []
+    for pattern in patterns:
+        if pattern == STDIN_PATH:
+            csv_paths.append(Path(pattern))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                print(f"Error: No CSV files match: {pattern}")
+                sys.exit(1)
+            csv_paths.extend(Path(match) for match in matches)
+        elif Path(pattern).exists():
+            csv_paths.append(Path(pattern))
+        else:
+            print(f"Error: CSV file not found: {pattern}")
+            sys.exit(1)
+    return list(dict.fromkeys(csv_paths))
+
+
 def main():
     """Main function."""
     import argparse
     
     parser = argparse.ArgumentParser(
-        description='Analyze Taegis XDR detection CSV and generate Sankey diagram'
+        description='Analyze Taegis XDR detection CSV and generate Sankey diagram',
+        epilog="Use 'merge PARTIAL [PARTIAL ...]' to combine partial aggregates written with "
+               "--emit-partial (see 'merge --help')"
     )
     parser.add_argument(
         'csv_file',
         type=str,
-        help='Path to the Taegis XDR detections CSV file'
+        nargs='+',
+        help="Paths or glob patterns of Taegis XDR detections CSV files (optionally .gz, .bz2, "
+             ".zst or .zip compressed), merged into one analysis, or '-' to read a CSV from stdin"
     )
     parser.add_argument(
         '--chunk-size',
@@ -274,6 +3528,13 @@ def main():
         default=100000,
         help='Number of rows to process at a time (default: 100000)'
     )
+    parser.add_argument(
+        '--max-memory',
+        type=parse_memory_size,
+        default=None,
+        help='Memory budget such as 512M or 2G; chunks are sized from the measured bytes per row '
+             'to stay within it, instead of a fixed --chunk-size'
+    )
     parser.add_argument(
         '--output',
         type=str,
@@ -285,32 +3546,235 @@ def main():
         action='store_true',
         help='Exclude INFO severity level from analysis (focus on LOW, MEDIUM, HIGH, CRITICAL)'
     )
+    parser.add_argument(
+        '--where',
+        type=str,
+        default=None,
+        help="Only analyze rows matching this filter, e.g. "
+             "\"severity in (HIGH,CRITICAL) and status != SUPPRESSED and tenant_id = 123\""
+    )
+    parser.add_argument(
+        '--since',
+        type=str,
+        default=None,
+        help='Only analyze detections created at or after this time: an ISO 8601 timestamp '
+             '(UTC unless it has a time zone) or a duration back from now such as 7d, 12h or 2w'
+    )
+    parser.add_argument(
+        '--until',
+        type=str,
+        default=None,
+        help='Only analyze detections created before this time, in the same formats as --since'
+    )
+    parser.add_argument(
+        '--time-column',
+        type=str,
+        default=TIME_COLUMN,
+        help=f'Timestamp column --since and --until apply to (default: {TIME_COLUMN})'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['pandas', 'pyarrow'],
+        default='pandas',
+        help='CSV reader: pandas (default) or pyarrow for multithreaded streaming (requires pyarrow)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=parse_worker_count,
+        default=1,
+        help='Number of processes scanning record-aligned byte ranges in parallel (default: 1)'
+    )
+    parser.add_argument(
+        '--mmap',
+        action='store_true',
+        help='Read the CSV through a memory map shared with the OS page cache'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help='Directory for cached results and a Parquet copy of the CSV, reused by later runs on the same file'
+    )
+    parser.add_argument(
+        '--checkpoint',
+        type=str,
+        default=None,
+        help='Checkpoint file for an append-only CSV: only records added since the last run are scanned'
+    )
+    parser.add_argument(
+        '--emit-partial',
+        type=str,
+        default=None,
+        help="Also write the aggregated results to this partial aggregate file (e.g. out.agg) "
+             "for the 'merge' subcommand"
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Profile the read, parse, filter, aggregate, summary and render stages separately'
+    )
+    parser.add_argument(
+        '--profile-dir',
+        type=str,
+        default='profile',
+        help='Directory for --profile output: per-stage .pstats dumps and a collapsed-stack '
+             'file for flame graphs (default: profile)'
+    )
+    parser.add_argument(
+        '--metrics-json',
+        type=str,
+        default=None,
+        help='Write run metrics (per-stage and per-chunk rows, bytes, wall time, rows/sec and '
+             'peak memory) to this JSON file'
+    )
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        merge_main(sys.argv[2:])
+        return
     
     args = parser.parse_args()
     
-    csv_path = Path(args.csv_file)
-    if not csv_path.exists():
-        print(f"Error: CSV file not found: {csv_path}")
-        sys.exit(1)
+    csv_paths = expand_input_paths(args.csv_file)
+    if args.where:
+        try:
+            compile_where(args.where)
+        except ValueError as e:
+            print(f"Error: Invalid --where expression: {e}")
+            sys.exit(1)
+    now = pd.Timestamp.now(tz='UTC')
+    since = until = None
+    for option, value in (('--since', args.since), ('--until', args.until)):
+        if value is None:
+            continue
+        try:
+            bound = parse_time_bound(value, now)
+        except ValueError as e:
+            print(f"Error: Invalid {option} time: {e}")
+            sys.exit(1)
+        if option == '--since':
+            since = bound
+        else:
+            until = bound
+    if since is not None or until is not None:
+        try:
+            compile_where(f"{args.time_column} < '{now.isoformat()}'")
+        except ValueError:
+            print(f"Error: Invalid --time-column name: {args.time_column!r}")
+            sys.exit(1)
     
-    # Process CSV file
+    if args.profile:
+        if args.workers > 1:
+            print("Note: --profile only covers the main process, run with --workers 1 "
+                  "to profile the scan itself")
+        start_profiling()
+    if args.metrics_json:
+        start_metrics({
+            'inputs': [str(path) for path in csv_paths],
+            'engine': args.engine,
+            'workers': args.workers,
+            'chunk_size': args.chunk_size,
+            'max_memory': args.max_memory,
+            'exclude_info': args.exclude_info,
+            'where': args.where,
+            'since': since.isoformat() if since is not None else None,
+            'until': until.isoformat() if until is not None else None,
+            'time_column': args.time_column,
+            'mmap': args.mmap,
+            'cache_dir': args.cache_dir,
+            'checkpoint': args.checkpoint,
+        })
+    
+    # Process CSV files
     flow_counts, sensor_types_set, severity_set, status_set, total_rows = process_csv_chunks(
-        csv_path, args.chunk_size, exclude_info=args.exclude_info
+        csv_paths if len(csv_paths) > 1 else csv_paths[0], args.chunk_size,
+        exclude_info=args.exclude_info, engine=args.engine, workers=args.workers,
+        use_mmap=args.mmap, cache_dir=args.cache_dir, checkpoint_path=args.checkpoint,
+        partial_path=args.emit_partial, max_memory=args.max_memory, where=args.where,
+        time_column=args.time_column, since=since, until=until,
+        relative_time=any(value is not None and match_duration(value)
+                          for value in (args.since, args.until))
+    )
+    
+    report_results(flow_counts, sensor_types_set, severity_set, status_set, total_rows, args.output)
+    
+    if args.profile:
+        stop_profiling(args.profile_dir)
+    if args.metrics_json:
+        stop_metrics(args.metrics_json)
+
+
+def merge_main(argv):
+    """Merge partial aggregate files into one summary and Sankey diagram."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} merge",
+        description='Merge partial aggregates written with --emit-partial and generate one Sankey diagram'
+    )
+    parser.add_argument(
+        'partial_files',
+        type=str,
+        nargs='+',
+        help='Paths or glob patterns of partial aggregate files'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='sankey_diagram.png',
+        help='Output path for Sankey diagram (default: sankey_diagram.png)'
     )
+    parser.add_argument(
+        '--emit-partial',
+        type=str,
+        default=None,
+        help='Also write the merged aggregate to this partial aggregate file'
+    )
+    args = parser.parse_args(argv)
+    
+    partial_paths = expand_input_paths(args.partial_files)
+    print(f"Merging {len(partial_paths)} partial aggregate files")
+    try:
+        flow_counts, total_rows, excluded_rows, exclude_info, where, sources = merge_partials(partial_paths)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not merge partial aggregates: {e}")
+        sys.exit(1)
+    
+    print(f"\nFinished merging {total_rows:,} rows from {len(sources)} source files")
+    if exclude_info:
+        print(f"Excluded {excluded_rows:,} rows with INFO severity")
+    if where:
+        print(f"Partials were filtered with --where: {where}")
+    if args.emit_partial:
+        write_partial(args.emit_partial, flow_counts, total_rows, excluded_rows, exclude_info, sources,
+                      where)
+        print(f"Saved partial aggregate: {args.emit_partial}")
     
+    report_results(
+        flow_counts, set(flow_counts.marginal(0)), set(flow_counts.marginal(1)),
+        set(flow_counts.marginal(2)), total_rows, args.output
+    )
+
+
+def report_results(flow_counts, sensor_types_set, severity_set, status_set, total_rows, output_path):
+    """Print the summary statistics and create the Sankey diagram."""
     if not flow_counts:
         print("Error: No valid data found in CSV file")
         sys.exit(1)
     
-    # Print summary statistics
-    print_summary_statistics(
-        flow_counts, sensor_types_set, severity_set, status_set, total_rows
-    )
+    with profile_stage('summary'):
+        # Marginal and pairwise totals shared by the summary and the diagram
+        rollups = compute_rollups(flow_counts)
+        
+        # Print summary statistics
+        print_summary_statistics(
+            flow_counts, sensor_types_set, severity_set, status_set, total_rows, rollups
+        )
     
     # Create Sankey diagram
-    create_sankey_diagram(
-        flow_counts, sensor_types_set, severity_set, status_set, args.output
-    )
+    with profile_stage('render'):
+        create_sankey_diagram(
+            flow_counts, sensor_types_set, severity_set, status_set, output_path, rollups
+        )
     
     print("\nAnalysis complete!")
 
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Ingest Benchmarks for analyze_taegis_detections.py
+
+Times every ingest path of process_csv_chunks on the same (synthetic or given)
+detections CSV and reports rows/sec, MB/sec and peak RSS. Each path runs in a
+fresh interpreter so that peak memory and warm caches do not leak between
+paths, and every path's flow counts are checked against the first path run.
+"""
+
+import gzip
+import hashlib
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is reported as unknown there
+    resource = None
+
+# Ingest paths in the order they are run: name -> (description, needs pyarrow)
+INGEST_PATHS = {
+    'legacy-iterrows': ('original pd.read_csv + iterrows loop', False),
+    'pandas': ('--engine pandas', False),
+    'pandas-mmap': ('--engine pandas --mmap', False),
+    'pandas-workers': ('--engine pandas --workers N', False),
+    'pyarrow': ('--engine pyarrow', True),
+    'pyarrow-workers': ('--engine pyarrow --workers N', True),
+    'gzip': ('--engine pandas on a .csv.gz copy', False),
+    'parquet-cache': ('--cache-dir, warm Parquet copy', True),
+    'result-cache': ('--cache-dir, warm result cache', False),
+}
+
+
+def get_peak_rss_mb():
+    """Return the peak RSS of this process and its finished children in MB, or None."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def get_flow_digest(flow_counts):
+    """Hash flow counts independently of their container and ordering."""
+    flows = sorted([list(key) + [int(count)] for key, count in flow_counts.items()])
+    return hashlib.sha1(json.dumps(flows).encode('utf-8')).hexdigest()
+
+
+def get_source_path(name, csv_path, workdir):
+    """Return the file a path reads: the CSV itself, or its gzip copy."""
+    return Path(workdir) / 'detections.csv.gz' if name == 'gzip' else Path(csv_path)
+
+
+def run_path(name, csv_path, workdir, workers, exclude_info, chunk_size):
+    """
+    Run one ingest path in this process.
+
+    Returns:
+        Tuple of (flow_counts, total_rows)
+    """
+    from analyze_taegis_detections import process_csv_chunks
+
+    cache_dir = str(Path(workdir) / 'cache')
+    if name == 'legacy-iterrows':
+        from legacy import legacy_process_csv_chunks
+        result = legacy_process_csv_chunks(csv_path, chunk_size, exclude_info)
+    elif name in ('parquet-cache', 'result-cache'):
+        result = process_csv_chunks(csv_path, chunk_size, exclude_info, cache_dir=cache_dir)
+    else:
+        engine = 'pyarrow' if name.startswith('pyarrow') else 'pandas'
+        result = process_csv_chunks(
+            get_source_path(name, csv_path, workdir), chunk_size, exclude_info, engine=engine,
+            workers=workers if name.endswith('-workers') else 1, use_mmap=name == 'pandas-mmap'
+        )
+    return result[0], result[-1]
+
+
+def prepare_path(name, csv_path, workdir, exclude_info, chunk_size):
+    """Untimed setup run in its own process before a path is measured."""
+    from analyze_taegis_detections import process_csv_chunks
+
+    cache_dir = Path(workdir) / 'cache'
+    if name in ('parquet-cache', 'result-cache'):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        # A warm result cache is only hit with the same filter options; with
+        # the other options only the Parquet copy can be reused
+        warm_exclude_info = exclude_info if name == 'result-cache' else not exclude_info
+        process_csv_chunks(csv_path, chunk_size, warm_exclude_info, cache_dir=str(cache_dir))
+
+
+def child_main(args):
+    """Entry point of the per-path benchmark processes."""
+    import contextlib
+    import io
+
+    # Import outside the timed region; plotly and pyarrow take a while to load
+    import analyze_taegis_detections  # noqa: F401
+    import legacy  # noqa: F401
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.prepare:
+            prepare_path(args.child, args.csv, args.workdir, args.exclude_info, args.chunk_size)
+            return
+        start = time.perf_counter()
+        flow_counts, total_rows = run_path(
+            args.child, args.csv, args.workdir, args.workers, args.exclude_info, args.chunk_size
+        )
+        seconds = time.perf_counter() - start
+    print(json.dumps({
+        'rows': total_rows,
+        'seconds': seconds,
+        'peak_rss_mb': get_peak_rss_mb(),
+        'flow_digest': get_flow_digest(flow_counts),
+    }))
+
+
+def run_child(name, csv_path, workdir, workers, exclude_info, chunk_size, prepare=False):
+    """Run a path (or its preparation) in a fresh interpreter and return its result dict."""
+    command = [
+        sys.executable, str(Path(__file__).resolve()), '--child', name, '--csv', str(csv_path),
+        '--workdir', str(workdir), '--workers', str(workers), '--chunk-size', str(chunk_size),
+    ]
+    if exclude_info:
+        command.append('--exclude-info')
+    if prepare:
+        command.append('--prepare')
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{completed.stdout}{completed.stderr}")
+    if prepare:
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_results(results):
+    """Print the benchmark table."""
+    print("\n" + "=" * 96)
+    print(f"{'Path':<18} {'Rows':>12} {'Seconds':>9} {'Rows/sec':>12} {'MB/sec':>9} "
+          f"{'Peak RSS MB':>12}  Flows")
+    print("-" * 96)
+    for result in results:
+        rss = f"{result['peak_rss_mb']:,.0f}" if result['peak_rss_mb'] is not None else 'n/a'
+        print(f"{result['path']:<18} {result['rows']:>12,} {result['seconds']:>9.2f} "
+              f"{result['rows_per_sec']:>12,.0f} {result['mb_per_sec']:>9,.1f} {rss:>12}  "
+              f"{'ok' if result['matches'] else 'MISMATCH'}")
+    print("=" * 96)
+
+
+def main():
+    """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark the ingest paths of analyze_taegis_detections.py'
+    )
+    parser.add_argument('--csv', type=str, default=None,
+                        help='Existing detections CSV to benchmark (default: generate one)')
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='Rows of the generated CSV (default: 1000000)')
+    parser.add_argument('--sensor-types', type=int, default=15,
+                        help='Distinct sensor types in the generated CSV (default: 15)')
+    parser.add_argument('--multi-sensor-ratio', type=float, default=0.2,
+                        help='Fraction of generated rows with several sensor types (default: 0.2)')
+    parser.add_argument('--wide-columns', type=int, default=0,
+                        help='Extra free-text columns in the generated CSV (default: 0)')
+    parser.add_argument('--paths', type=str, default=','.join(INGEST_PATHS),
+                        help=f"Comma-separated ingest paths to run (default: all of {', '.join(INGEST_PATHS)})")
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Workers for the *-workers paths (default: 4)')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help='Rows per chunk (default: 100000)')
+    parser.add_argument('--exclude-info', action='store_true', help='Benchmark with --exclude-info')
+    parser.add_argument('--workdir', type=str, default=None,
+                        help='Directory for generated files and caches (default: a temporary directory)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args)
+        return
+
+    names = [name.strip() for name in args.paths.split(',') if name.strip()]
+    unknown = [name for name in names if name not in INGEST_PATHS]
+    if unknown:
+        print(f"Error: Unknown ingest paths: {unknown}")
+        print(f"Available paths: {list(INGEST_PATHS)}")
+        sys.exit(1)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        skipped = [name for name in names if INGEST_PATHS[name][1]]
+        if skipped:
+            print(f"Note: pyarrow is not installed, skipping {', '.join(skipped)}")
+        names = [name for name in names if not INGEST_PATHS[name][1]]
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='taegis-bench-'))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        if args.csv:
+            csv_path = Path(args.csv)
+        else:
+            from generate_detections import generate_detections
+            csv_path = workdir / 'detections.csv'
+            print(f"Generating {args.rows:,} rows...")
+            generate_detections(csv_path, args.rows, args.sensor_types, args.multi_sensor_ratio,
+                                wide_columns=args.wide_columns)
+        if 'gzip' in names:
+            with open(csv_path, 'rb') as src, gzip.open(workdir / 'detections.csv.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+
+        print(f"Benchmarking {csv_path} ({csv_path.stat().st_size / (1024 * 1024):,.1f} MB)")
+        results = []
+        reference_digest = None
+        for name in names:
+            print(f"  {name}: {INGEST_PATHS[name][0]}...")
+            run_child(name, csv_path, workdir, args.workers, args.exclude_info, args.chunk_size,
+                      prepare=True)
+            result = run_child(name, csv_path, workdir, args.workers, args.exclude_info,
+                               args.chunk_size)
+            if reference_digest is None:
+                reference_digest = result['flow_digest']
+            size_mb = get_source_path(name, csv_path, workdir).stat().st_size / (1024 * 1024)
+            result.update({
+                'path': name,
+                'rows_per_sec': result['rows'] / result['seconds'] if result['seconds'] else 0.0,
+                'mb_per_sec': size_mb / result['seconds'] if result['seconds'] else 0.0,
+                'matches': result['flow_digest'] == reference_digest,
+            })
+            results.append(result)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'csv': str(csv_path), 'workers': args.workers,
+                       'exclude_info': args.exclude_info, 'results': results}, f, indent=2)
+        print(f"Saved results to {args.json}")
+    if not all(result['matches'] for result in results):
+        print("Error: Some ingest paths produced different flow counts")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Sensor Types Parser Equivalence Check
+
+Property-based check that tokenize_sensor_types, the exception-free fast
+path, returns exactly what parse_sensor_types returns for every value it
+accepts, and that explode_sensor_types, the whole-column explode, yields the
+same sensor types per value as parse_sensor_types. Values are drawn at random
+both from the export formats and from adversarial mixes of brackets, quotes,
+escapes, whitespace and literals. Also times both parsers on the formats
+found in real exports.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from analyze_taegis_detections import (  # noqa: E402
+    explode_sensor_types, parse_sensor_types, tokenize_sensor_types,
+)
+from generate_detections import (  # noqa: E402
+    SENSOR_TYPES_FORMATS, build_sensor_types, format_sensor_types,
+)
+
+# Fragments the adversarial values are assembled from
+FRAGMENTS = [
+    '[', ']', '"', "'", ',', ', ', ' ', '\t', '\n', '\\', '\\"', "\\'", '\\t', '\\u0041',
+    'A', 'ENDPOINT_TAEGIS', 'Azure AD', 'x-y', 'a.b', 'é', '\x7f', '\x00', '#', '(', ')',
+    '{', '}', ':', '1', '1e3', '-2', '0x1F', 'true', 'false', 'null', 'NaN', 'Infinity',
+    'True', 'False', 'None', 'u', 'b', 'r',
+]
+
+NAMES = ['A', 'ENDPOINT_TAEGIS', 'Azure AD', 'it\'s', 'say "hi"', 'a]b', 'a,b', 'é', '', ' pad ', 'a\tb']
+
+
+def random_fragments(rng):
+    """Concatenate random fragments into a value."""
+    return ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 12)))
+
+
+def random_array(rng):
+    """A bracketed array with randomly quoted items, separators and whitespace."""
+    space = lambda: rng.choice(['', '', ' ', '  ', '\t', '\n'])  # noqa: E731
+    items = []
+    for _ in range(rng.randint(0, 4)):
+        name = rng.choice(NAMES)
+        quote = rng.choice(['"', "'", '', '"'])
+        items.append(space() + quote + name + quote + space())
+    separator = rng.choice([',', ',', ', ', ' ,', ' '])
+    value = '[' + separator.join(items) + rng.choice(['', '', ',', ', ']) + ']'
+    if rng.random() < 0.2:
+        value = '"' + value + '"'
+    if rng.random() < 0.1:
+        value = rng.choice([' ', '\t', 'x', '"']) + value + rng.choice(['', ' ', 'x', '"'])
+    return value
+
+
+def random_export_value(rng, sensor_types):
+    """A value in one of the formats the benchmark generator writes."""
+    formats = [fmt for fmt, _ in SENSOR_TYPES_FORMATS]
+    weights = [weight for _, weight in SENSOR_TYPES_FORMATS]
+    fmt = rng.choices(formats, weights)[0]
+    return format_sensor_types(rng, rng.sample(sensor_types, rng.randint(1, 3)), fmt)
+
+
+def random_value_generators():
+    """Return the functions random values are drawn from."""
+    sensor_types = build_sensor_types(30)
+    return [random_fragments, random_array, lambda r: random_export_value(r, sensor_types)]
+
+
+def check_equivalence(iterations, seed):
+    """
+    Compare both parsers on random values.
+
+    Returns:
+        Tuple of (checked, fast_path_hits, mismatches)
+    """
+    rng = random.Random(seed)
+    generators = random_value_generators()
+    hits = 0
+    mismatches = []
+    for _ in range(iterations):
+        value = rng.choice(generators)(rng)
+        fast = tokenize_sensor_types(value)
+        if fast is None:
+            continue
+        hits += 1
+        try:
+            expected = parse_sensor_types(value)
+        except Exception as e:
+            expected = f"<{type(e).__name__}>"
+        if fast != expected:
+            mismatches.append((value, fast, expected))
+    return iterations, hits, mismatches
+
+
+def check_explode(iterations, seed, column_size=500):
+    """
+    Compare explode_sensor_types on columns of random distinct values with
+    parse_sensor_types on each value. Values parse_sensor_types raises on are
+    skipped, as explode_sensor_types raises on them too.
+
+    Returns:
+        List of (value, exploded, expected) mismatches
+    """
+    rng = random.Random(seed)
+    generators = random_value_generators()
+    mismatches = []
+    for _ in range(max(iterations // column_size, 1)):
+        values = list(dict.fromkeys(rng.choice(generators)(rng) for _ in range(column_size)))
+        expected = []
+        for value in values:
+            try:
+                expected.append(parse_sensor_types(value))
+            except Exception:
+                expected.append(None)
+        values = [value for value, parsed in zip(values, expected) if parsed is not None]
+        expected = [parsed for parsed in expected if parsed is not None]
+        exploded = [[] for _ in values]
+        for position, sensor_type in zip(*explode_sensor_types(values)):
+            exploded[position].append(sensor_type)
+        mismatches.extend((value, got, want) for value, got, want in zip(values, exploded, expected)
+                          if got != want)
+    return mismatches
+
+
+def time_parsers(values, repeat):
+    """Return seconds taken by parse_sensor_types and by the fast path with fallback."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in values:
+            parse_sensor_types(value)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in values:
+            if tokenize_sensor_types(value) is None:
+                parse_sensor_types(value)
+    fast_seconds = time.perf_counter() - start
+    return legacy_seconds, fast_seconds
+
+
+def main():
+    """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Check tokenize_sensor_types against parse_sensor_types and time both'
+    )
+    parser.add_argument('--iterations', type=int, default=200000,
+                        help='Random values to check (default: 200000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    checked, hits, mismatches = check_equivalence(args.iterations, args.seed)
+    print(f"Checked {checked:,} random values, {hits:,} handled by the fast path")
+    for value, fast, expected in mismatches[:20]:
+        print(f"  MISMATCH {value!r}: fast path {fast!r}, parse_sensor_types {expected!r}")
+
+    explode_mismatches = check_explode(args.iterations, args.seed)
+    print(f"Checked explode_sensor_types on {args.iterations:,} random values")
+    for value, exploded, expected in explode_mismatches[:20]:
+        print(f"  MISMATCH {value!r}: exploded {exploded!r}, parse_sensor_types {expected!r}")
+
+    rng = random.Random(args.seed)
+    sensor_types = build_sensor_types(30)
+    values = [random_export_value(rng, sensor_types) for _ in range(5000)]
+    handled = sum(tokenize_sensor_types(value) is not None for value in values)
+    legacy_seconds, fast_seconds = time_parsers(values, 5)
+    print(f"Export-format values handled by the fast path: {100 * handled / len(values):.1f}%")
+    print(f"parse_sensor_types: {legacy_seconds:.3f}s, fast path with fallback: {fast_seconds:.3f}s "
+          f"({legacy_seconds / fast_seconds:.1f}x)")
+
+    if mismatches or explode_mismatches:
+        print(f"Error: {len(mismatches) + len(explode_mismatches):,} values parsed differently")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Synthetic Taegis XDR Detections Export Generator
+
+Writes a CSV shaped like a Taegis XDR "Export all as CSV" detections export,
+for benchmarking the ingest paths of analyze_taegis_detections.py at scale.
+Every sensor_types quoting variant handled by parse_sensor_types is mixed in,
+along with quoted/empty severity and status cells and wide free-text columns.
+"""
+
+import bz2
+import csv
+import gzip
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Realistic sensor names, extended with synthetic ones for higher cardinalities
+BASE_SENSOR_TYPES = [
+    'ENDPOINT_TAEGIS', 'ENDPOINT_REDCLOAK', 'ENDPOINT_CROWDSTRIKE', 'ENDPOINT_SENTINELONE',
+    'NETWORK', 'FIREWALL', 'AWS_CLOUDTRAIL', 'AZURE_AD', 'O365', 'GOOGLE_WORKSPACE',
+    'Mimecast', 'Proofpoint', 'OKTA', 'DNS', 'NIDS',
+]
+
+SEVERITIES = ['INFO', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+SEVERITY_WEIGHTS = [45, 25, 18, 9, 3]
+
+STATUSES = ['OPEN', 'SUPPRESSED', 'RESOLVED', 'TRUE_POSITIVE', 'FALSE_POSITIVE', 'NOT_ACTIONABLE']
+STATUS_WEIGHTS = [40, 25, 15, 8, 8, 4]
+
+# sensor_types encodings seen in exports (and handled by parse_sensor_types),
+# with their relative frequency
+SENSOR_TYPES_FORMATS = [
+    ('json', 70),           # ["A","B"]
+    ('python', 8),          # ['A', 'B']  (ast.literal_eval fallback)
+    ('bare', 5),            # A           (plain string)
+    ('quoted_json', 5),     # "[""A""]"   (whole value wrapped in quotes)
+    ('unquoted_list', 4),   # [A, B]      (bracket-splitting fallback)
+    ('empty', 3),           # empty cell
+    ('empty_list', 2),      # []
+    ('empty_quoted', 1),    # ""
+    ('non_string', 2),      # [1e3, true]
+]
+
+CSV_COLUMNS = [
+    'id', 'created_at', 'tenant_id', 'name', 'description', 'sensor_types',
+    'severity', 'status', 'confidence', 'entities', 'mitre_attack',
+]
+
+
+def build_sensor_types(cardinality):
+    """Return cardinality distinct sensor type names."""
+    sensor_types = BASE_SENSOR_TYPES[:cardinality]
+    sensor_types += [f"SENSOR_{n:05d}" for n in range(cardinality - len(sensor_types))]
+    return sensor_types
+
+
+def format_sensor_types(rng, sensor_types, fmt):
+    """Render a list of sensor types in one of the SENSOR_TYPES_FORMATS encodings."""
+    if fmt == 'json':
+        return json.dumps(sensor_types, separators=(',', ':'))
+    if fmt == 'python':
+        return '[' + ', '.join(f"'{s}'" for s in sensor_types) + ']'
+    if fmt == 'bare':
+        return sensor_types[0]
+    if fmt == 'quoted_json':
+        return '"' + json.dumps(sensor_types, separators=(',', ':')) + '"'
+    if fmt == 'unquoted_list':
+        return '[' + ', '.join(sensor_types) + ']'
+    if fmt == 'empty':
+        return ''
+    if fmt == 'empty_list':
+        return '[]'
+    if fmt == 'empty_quoted':
+        return '""'
+    return f"[{rng.choice(['1e3', '42', 'true', 'null'])}, {rng.choice(['true', '7'])}]"
+
+
+def format_label(rng, label, quoted_ratio=0.03, empty_ratio=0.01):
+    """Occasionally wrap a severity/status label in quotes or leave it empty."""
+    r = rng.random()
+    if r < empty_ratio:
+        return ''
+    if r < empty_ratio + quoted_ratio:
+        return f'"{label}"'
+    return label
+
+
+def junk_text(rng, size):
+    """Free text with the commas, quotes and newlines that make CSV parsing expensive."""
+    words = ['process', 'spawned', '"powershell.exe"', 'from', 'C:\\Windows\\Temp', 'with,',
+             'encoded', 'args\n', 'user', 'admin@example.com', 'blocked', 'by', 'policy.']
+    text = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        text.append(word)
+        length += len(word) + 1
+    return ' '.join(text)
+
+
+def open_output(path):
+    """Open the output for text writing, compressing by .gz or .bz2 extension."""
+    if path.suffix == '.gz':
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    if path.suffix == '.bz2':
+        return bz2.open(path, 'wt', newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def generate_detections(output_path, rows, sensor_type_cardinality=len(BASE_SENSOR_TYPES),
+                        multi_sensor_ratio=0.2, max_sensors_per_row=3, wide_columns=0,
+                        wide_column_size=200, seed=0):
+    """
+    Write a synthetic detections CSV.
+
+    Args:
+        output_path: CSV file to write (.gz / .bz2 suffixes are compressed)
+        rows: Number of detection rows
+        sensor_type_cardinality: Number of distinct sensor types
+        multi_sensor_ratio: Fraction of rows whose sensor_types array holds
+            more than one sensor
+        max_sensors_per_row: Largest sensor_types array
+        wide_columns: Extra free-text columns appended to every row
+        wide_column_size: Approximate characters per free-text cell
+        seed: Random seed, so a given configuration always yields the same file
+
+    Returns:
+        Path of the written file
+    """
+    rng = random.Random(seed)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    sensor_types = build_sensor_types(sensor_type_cardinality)
+    formats = [fmt for fmt, _ in SENSOR_TYPES_FORMATS]
+    format_weights = [weight for _, weight in SENSOR_TYPES_FORMATS]
+    tenants = [f"{rng.randrange(10000, 99999)}" for _ in range(25)]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    # Pre-render a pool of junk cells; generating fresh text per row dominates otherwise
+    junk_pool = [junk_text(rng, wide_column_size) for _ in range(256)]
+
+    with open_output(output_path) as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS + [f"extra_{n}" for n in range(wide_columns)])
+        for row_id in range(rows):
+            if rng.random() < multi_sensor_ratio and len(sensor_types) > 1:
+                count = rng.randint(2, max(2, min(max_sensors_per_row, len(sensor_types))))
+            else:
+                count = 1
+            row_sensor_types = rng.sample(sensor_types, count)
+            fmt = rng.choices(formats, format_weights)[0]
+            severity = rng.choices(SEVERITIES, SEVERITY_WEIGHTS)[0]
+            status = rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+            created_at = start + timedelta(seconds=row_id * 3 + rng.randrange(3))
+            writer.writerow([
+                f"detection-{row_id:010d}",
+                created_at.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                rng.choice(tenants),
+                f"Suspicious activity {rng.randrange(500)}",
+                rng.choice(junk_pool),
+                format_sensor_types(rng, row_sensor_types, fmt),
+                format_label(rng, severity),
+                format_label(rng, status),
+                f"{rng.random():.2f}",
+                json.dumps({'host': f"host-{rng.randrange(5000)}", 'user': f"u{rng.randrange(900)}"}),
+                rng.choice(['T1059.001', 'T1566', 'T1078,T1110', '']),
+            ] + [rng.choice(junk_pool) for _ in range(wide_columns)])
+    return output_path
+
+
+def main():
+    """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic Taegis XDR detections CSV for benchmarking'
+    )
+    parser.add_argument('output', type=str, help='Output CSV path (.gz / .bz2 are compressed)')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of rows (default: 1000000)')
+    parser.add_argument(
+        '--sensor-types',
+        type=int,
+        default=len(BASE_SENSOR_TYPES),
+        help=f"Number of distinct sensor types (default: {len(BASE_SENSOR_TYPES)})"
+    )
+    parser.add_argument(
+        '--multi-sensor-ratio',
+        type=float,
+        default=0.2,
+        help='Fraction of rows with several sensor types (default: 0.2)'
+    )
+    parser.add_argument(
+        '--max-sensors-per-row',
+        type=int,
+        default=3,
+        help='Largest sensor_types array (default: 3)'
+    )
+    parser.add_argument(
+        '--wide-columns',
+        type=int,
+        default=0,
+        help='Extra free-text columns per row (default: 0)'
+    )
+    parser.add_argument(
+        '--wide-column-size',
+        type=int,
+        default=200,
+        help='Approximate characters per free-text cell (default: 200)'
+    )
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    if args.rows < 0 or args.sensor_types < 1:
+        print("Error: --rows must be >= 0 and --sensor-types >= 1")
+        sys.exit(1)
+
+    path = generate_detections(
+        args.output, args.rows, args.sensor_types, args.multi_sensor_ratio,
+        args.max_sensors_per_row, args.wide_columns, args.wide_column_size, args.seed
+    )
+    print(f"Wrote {args.rows:,} rows to {path} ({path.stat().st_size / (1024 * 1024):,.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+The original row-at-a-time ingest loop of analyze_taegis_detections.py,
+kept as the baseline the benchmarks measure the current engines against.
+"""
+
+import sys
+from collections import defaultdict
+
+import pandas as pd
+
+from analyze_taegis_detections import clean_string_field, parse_sensor_types
+
+
+def legacy_process_csv_chunks(csv_path, chunk_size=100000, exclude_info=False):
+    """
+    Aggregate sensor_type → severity → status flows with pd.read_csv chunks
+    and DataFrame.iterrows, as the script originally did.
+
+    Returns:
+        Tuple of (flow_counts, sensor_types_set, severity_set, status_set, total_rows)
+    """
+    flow_counts = defaultdict(int)
+    total_rows = 0
+    sensor_types_set = set()
+    severity_set = set()
+    status_set = set()
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, low_memory=False):
+        if 'sensor_types' not in chunk.columns:
+            print("Error: 'sensor_types' column not found in CSV")
+            sys.exit(1)
+
+        for idx, row in chunk.iterrows():
+            total_rows += 1
+
+            sensor_types = parse_sensor_types(row.get('sensor_types'))
+            severity = clean_string_field(row.get('severity'))
+            status = clean_string_field(row.get('status'))
+
+            if not sensor_types or severity is None or status is None:
+                continue
+            if exclude_info and severity.upper() == 'INFO':
+                continue
+
+            sensor_types_set.update(sensor_types)
+            severity_set.add(severity)
+            status_set.add(status)
+            for sensor_type in sensor_types:
+                flow_counts[(sensor_type, severity, status)] += 1
+
+    return flow_counts, sensor_types_set, severity_set, status_set, total_rows